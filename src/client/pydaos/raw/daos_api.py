@@ -19,6 +19,7 @@ import inspect
 import sys
 import time
 import enum
+import itertools
 
 from . import daos_cref
 from . import conversion
@@ -41,6 +42,129 @@ DaosContPropEnum = enum.Enum(
 DAOS_ANCHOR_TYPE_EOF = 3
 
 
+def _list_all_attr_names(func, handle):
+    """Retrieve every attribute name through a daos_*_list_attr function.
+
+    The first call passes a NULL buffer so that DAOS reports the aggregate
+    size of the names, the second call fills a buffer of exactly that size.
+
+    Args:
+        func: daos_pool_list_attr or daos_cont_list_attr
+        handle: pool or container handle
+
+    Returns:
+        list: attribute names as bytes
+
+    """
+    size = ctypes.c_size_t(0)
+    ret = func(handle, None, ctypes.byref(size), None)
+    if ret != 0:
+        raise DaosApiError("List Attribute size returned non-zero. "
+                           "RC: {0}".format(ret))
+    if size.value == 0:
+        return []
+
+    buff = ctypes.create_string_buffer(size.value)
+    ret = func(handle, buff, ctypes.byref(size), None)
+    if ret != 0:
+        raise DaosApiError("List Attribute returned non-zero. "
+                           "RC: {0}".format(ret))
+
+    # names are packed as consecutive null-terminated strings
+    return buff.raw[:size.value].rstrip(b'\0').split(b'\0')
+
+
+def _get_attr_values(func, handle, attr_names):
+    """Fetch the values of attr_names through a daos_*_get_attr function.
+
+    The value sizes are discovered with a first call using zero-length
+    buffers, then all the values are fetched in a single call into one
+    contiguous buffer which is sliced into the individual values.
+
+    Args:
+        func: daos_pool_get_attr or daos_cont_get_attr
+        handle: pool or container handle
+        attr_names (list): attribute names as bytes
+
+    Returns:
+        dict: attribute name and value pairs
+
+    """
+    attr_count = len(attr_names)
+    if attr_count == 0:
+        return {}
+
+    names = (ctypes.c_char_p * attr_count)(*attr_names)
+    no_buffers = (ctypes.c_void_p * attr_count)()
+    sizes = (ctypes.c_size_t * attr_count)()
+    ret = func(handle, ctypes.c_int(attr_count), names, no_buffers, sizes,
+               None)
+    if ret != 0:
+        raise DaosApiError("Get Attribute size returned non-zero. "
+                           "RC: {0}".format(ret))
+
+    offsets = [0]
+    offsets.extend(itertools.accumulate(sizes))
+    data = ctypes.create_string_buffer(offsets[-1])
+    base = ctypes.addressof(data)
+    buffers = (ctypes.c_void_p * attr_count)(
+        *map(base.__add__, offsets[:-1]))
+    ret = func(handle, ctypes.c_int(attr_count), names, buffers, sizes, None)
+    if ret != 0:
+        raise DaosApiError("Get Attribute returned non-zero. "
+                           "RC: {0}".format(ret))
+
+    # slice with the sizes of the first call, so a value that grew in between
+    # is truncated instead of overlapping with its neighbour
+    raw = data.raw
+    return dict(zip(attr_names,
+                    map(raw.__getitem__,
+                        map(slice, offsets[:-1], offsets[1:]))))
+
+
+def _set_attr_values(func, handle, data):
+    """Set all the attributes of data through a daos_*_set_attr function.
+
+    The values are packed into one contiguous buffer, so the value pointers
+    and sizes are derived from offsets instead of per-value ctypes objects.
+
+    Args:
+        func: daos_pool_set_attr or daos_cont_set_attr
+        handle: pool or container handle
+        data (dict): attribute name and value pairs, as bytes
+
+    Raises:
+        DaosApiError: if data is empty, or if any of its values is empty
+
+    """
+    attr_count = len(data)
+    if attr_count == 0:
+        raise DaosApiError("Attribute dictionary should not be empty")
+
+    # DAOS rejects the whole call for an empty value, so name it here
+    for name, value in data.items():
+        if not value:
+            raise DaosApiError(
+                "Attribute {0} should not have an empty value".format(name))
+
+    values = list(data.values())
+    lengths = list(map(len, values))
+    offsets = [0]
+    offsets.extend(itertools.accumulate(lengths))
+    blob = b''.join(values)
+    packed = ctypes.create_string_buffer(blob, max(len(blob), 1))
+    base = ctypes.addressof(packed)
+
+    names = (ctypes.c_char_p * attr_count)(*data.keys())
+    buffers = (ctypes.c_void_p * attr_count)(
+        *map(base.__add__, offsets[:-1]))
+    sizes = (ctypes.c_size_t * attr_count)(*lengths)
+    ret = func(handle, ctypes.c_int(attr_count), names, buffers, sizes, None)
+    if ret != 0:
+        raise DaosApiError("Set Attribute returned non-zero. "
+                           "RC: {0}".format(ret))
+
+
 class DaosPool():
     """A python object representing a DAOS pool."""
 
@@ -382,6 +506,40 @@ class DaosPool():
 
         return results
 
+    def get_all_attrs(self, poh=None):
+        """Retrieve all the user-defined pool attributes.
+
+        The attribute names and value sizes are discovered from DAOS, so no
+        buffer has to be sized by the caller.
+
+        Args:
+            poh [Optional]:     Pool Handle if you really want to override it
+        return:
+            All the attributes as a dictionary.
+        """
+        if poh is not None:
+            self.handle = poh
+
+        names = _list_all_attr_names(
+            self.context.get_function('list-pool-attr'), self.handle)
+        return _get_attr_values(
+            self.context.get_function('get-pool-attr'), self.handle, names)
+
+    def set_attrs(self, data, poh=None):
+        """Set a dictionary of user-defined pool attributes in one call.
+
+        Args:
+            data[Required]:     Dictionary of Attribute name and value.
+            poh [Optional]:     Pool Handler
+        return:
+            None
+        """
+        if poh is not None:
+            self.handle = poh
+
+        _set_attr_values(
+            self.context.get_function('set-pool-attr'), self.handle, data)
+
     # pylint: disable=unused-private-member
     @staticmethod
     def __pylist_to_array(pylist):
@@ -2151,6 +2309,40 @@ class DaosContainer():
 
         return results
 
+    def get_all_attrs(self, coh=None):
+        """Retrieve all the user-defined container attributes.
+
+        The attribute names and value sizes are discovered from DAOS, so no
+        buffer has to be sized by the caller.
+
+        Args:
+            coh [Optional]:     Container Handler
+        return:
+            dictionary containing all the attributes as key:value pairs.
+        """
+        if coh is not None:
+            self.coh = coh
+
+        names = _list_all_attr_names(
+            self.context.get_function('list-cont-attr'), self.coh)
+        return _get_attr_values(
+            self.context.get_function('get-cont-attr'), self.coh, names)
+
+    def set_attrs(self, data, coh=None):
+        """Set a dictionary of user-defined container attributes in one call.
+
+        Args:
+            data[Required]:     Dictionary of Attribute name and value.
+            coh [Optional]:     Container Handler
+        return:
+            None
+        """
+        if coh is not None:
+            self.coh = coh
+
+        _set_attr_values(
+            self.context.get_function('set-cont-attr'), self.coh, data)
+
     def aggregate(self, coh, epoch, cb_func=None):
         """Aggregate the container epochs.
 
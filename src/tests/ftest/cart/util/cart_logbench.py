@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 Intel Corporation
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+
+"""
+This provides benchmarks of the CaRT log parsing code.
+"""
+
+import bz2
+import sys
+import time
+import argparse
+
+import cart_logparse
+
+BATCH_SIZE = 100000
+
+def _anon_reference(line):
+    """Anonymise a line by trying each expression in turn
+
+    This is how LogLine.get_anon_msg() used to work, and is kept as the
+    reference to compare against.
+    """
+    fields = []
+    for entry in line.get_msg().split()[1:]:
+        field = None
+        for (regex, anon) in ((line.re_region, '0x...-0x...'),
+                              (line.re_pointer, '0x...{}'),
+                              (line.re_pid, 'pid=<pid>'),
+                              (line.re_uuid, 'uuid{}'),
+                              (line.re_uuid_rank, 'uuid/rank{}'),
+                              (line.re_uiod, 'uoid.{}'),
+                              (line.re_rpcid, 'rpcid=<rpcid>'),
+                              (line.re_cont, 'pool/cont{}')):
+            match = regex.fullmatch(entry)
+            if match:
+                if match.groups():
+                    field = anon.format(match.group(1))
+                else:
+                    field = anon
+                break
+        fields.append(field or entry)
+    return '{}() {}'.format(line.function, ' '.join(fields))
+
+def _get_lines(log_iter):
+    """Yield batches of lines which have a function to anonymise"""
+    batch = []
+    for line in log_iter.new_iter():
+        try:
+            line.function
+        except AttributeError:
+            continue
+        batch.append(line)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def bench_anon(log_iter, reference=False):
+    """Measure the rate that lines of a log file are anonymised"""
+    if reference:
+        anon = _anon_reference
+    else:
+        anon = cart_logparse.LogLine.get_anon_msg
+
+    line_count = 0
+    token_count = 0
+    elapsed = 0
+    for batch in _get_lines(log_iter):
+        token_count += sum(len(line.get_msg().split()) - 1 for line in batch)
+        line_count += len(batch)
+        start = time.perf_counter()
+        for line in batch:
+            anon(line)
+        elapsed += time.perf_counter() - start
+
+    if not elapsed:
+        print('No lines to anonymise')
+        return
+    print('Anonymised {} lines, {} tokens in {:.2f} seconds'.format(
+        line_count, token_count, elapsed))
+    print('{:,.0f} lines/s {:,.0f} tokens/s'.format(line_count / elapsed,
+                                                    token_count / elapsed))
+
+def _parse_reference(data):
+    """Parse a line by checking the preamble and then splitting it again
+
+    This is how LogIter used to read lines, and is kept as the reference to
+    compare against.
+    """
+    fields = data.split(None, 8)
+    (line, _) = cart_logparse.decode_line(data)
+    if len(fields) < 6 or len(fields[0]) != 17 or fields[0][2:3] != b'/':
+        return cart_logparse.LogRaw(line)
+    return cart_logparse.LogLine(line)
+
+def _parse(data):
+    """Parse a line as LogIter does"""
+    (line, _) = cart_logparse.decode_line(data)
+    preamble = cart_logparse.parse_preamble(line)
+    if preamble is None:
+        return cart_logparse.LogRaw(line)
+    return cart_logparse.LogLine(line, preamble)
+
+def _read_batches(fname):
+    """Yield batches of lines of a file as bytes"""
+    if fname.endswith('.bz2'):
+        fd = bz2.open(fname, 'rb')
+    else:
+        fd = open(fname, 'rb')
+    with fd:
+        batch = []
+        for data in fd:
+            batch.append(data)
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def bench_parse(fname, reference=False):
+    """Measure the rate that lines of a log file are parsed"""
+    if reference:
+        parse = _parse_reference
+    else:
+        parse = _parse
+
+    line_count = 0
+    byte_count = 0
+    elapsed = 0
+    for batch in _read_batches(fname):
+        line_count += len(batch)
+        byte_count += sum(len(data) for data in batch)
+        start = time.perf_counter()
+        for data in batch:
+            parse(data)
+        elapsed += time.perf_counter() - start
+
+    if not elapsed:
+        print('No lines to parse')
+        return
+    print('Parsed {} lines, {} bytes in {:.2f} seconds'.format(
+        line_count, byte_count, elapsed))
+    print('{:,.0f} lines/s {:,.1f} MB/s'.format(line_count / elapsed,
+                                                byte_count / elapsed / 1e6))
+
+def run():
+    """Benchmark the parsing of a single file"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reference',
+                        help='Benchmark the reference implementation',
+                        action='store_true')
+    parser.add_argument('--parse',
+                        help='Benchmark parsing lines rather than '
+                        'anonymising them',
+                        action='store_true')
+    parser.add_argument('file', help='input file')
+    args = parser.parse_args()
+    if args.parse:
+        bench_parse(args.file, reference=args.reference)
+        return
+    log_iter = cart_logparse.LogIter(args.file)
+    bench_anon(log_iter, reference=args.reference)
+    if log_iter.file_corrupt:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 Intel Corporation
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+
+"""
+LogIndex class definition.
+
+This provides a persistent, queryable index of CaRT log files, so that a large
+log can be parsed once and then queried repeatedly.
+"""
+
+import os
+import re
+import sys
+import sqlite3
+import argparse
+
+import cart_logparse
+
+# Format version of the database, a database with a different version is
+# rebuilt.
+INDEX_VERSION = 1
+
+BATCH_SIZE = 10000
+
+re_opcode = re.compile(r"\[opc=(0x[0-9a-f]+)")
+re_rpcid = re.compile(r"rpcid=(0x[0-9a-f]+)")
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE lines (id INTEGER PRIMARY KEY,
+                    pid INTEGER,
+                    ts TEXT,
+                    level INTEGER,
+                    fac TEXT,
+                    file TEXT,
+                    lineno INTEGER,
+                    function TEXT,
+                    descriptor TEXT,
+                    opcode TEXT,
+                    rpcid TEXT,
+                    line TEXT);
+CREATE INDEX lines_pid ON lines (pid, id);
+CREATE INDEX lines_descriptor ON lines (descriptor);
+CREATE INDEX lines_rpcid ON lines (rpcid);
+CREATE INDEX lines_location ON lines (file, lineno);
+CREATE INDEX lines_level ON lines (level);
+"""
+
+class LogIndex():
+    """Class for querying an indexed CaRT log file
+
+    The log file is parsed with cart_logparse.LogIter and every log line is
+    stored in a SQLite database next to it, along with the fields used to
+    query it.  The database is reused while the log file is unchanged.
+
+    As well as the queries, get_pids() and new_iter() mirror LogIter so that
+    cart_logtest.LogTest can check a log file from its index.
+    """
+
+    def __init__(self, fname, db_file=None, rebuild=False):
+        self.fname = fname
+        self.file_corrupt = False
+        if db_file is None:
+            db_file = '{}.sqlite'.format(fname)
+        self.db_file = db_file
+
+        if rebuild or not self._is_current():
+            self._build()
+        self._db = sqlite3.connect(self.db_file)
+
+    def _get_meta(self):
+        """Return the metadata identifying the log file of the index"""
+        i = os.stat(self.fname)
+        return {'version': str(INDEX_VERSION),
+                'size': str(i.st_size),
+                'mtime': str(i.st_mtime_ns)}
+
+    def _is_current(self):
+        """Return True if the index exists, and is for the current log"""
+        if not os.path.exists(self.db_file):
+            return False
+        try:
+            with sqlite3.connect(self.db_file) as db:
+                meta = dict(db.execute('SELECT key, value FROM meta'))
+        except sqlite3.DatabaseError:
+            return False
+        self.file_corrupt = meta.pop('file_corrupt', 'False') == 'True'
+        return meta == self._get_meta()
+
+    def _build(self):
+        """Parse the log file, and build the index"""
+        tmp_file = '{}.tmp'.format(self.db_file)
+        if os.path.exists(tmp_file):
+            os.unlink(tmp_file)
+
+        log_iter = cart_logparse.LogIter(self.fname)
+        db = sqlite3.connect(tmp_file)
+        try:
+            db.executescript(SCHEMA)
+            rows = []
+            for line in log_iter.new_iter():
+                rows.append(_get_row(line))
+                if len(rows) == BATCH_SIZE:
+                    db.executemany(
+                        'INSERT INTO lines VALUES (NULL,?,?,?,?,?,?,?,?,?,?,?)',
+                        rows)
+                    rows = []
+            db.executemany(
+                'INSERT INTO lines VALUES (NULL,?,?,?,?,?,?,?,?,?,?,?)', rows)
+            meta = self._get_meta()
+            self.file_corrupt = log_iter.file_corrupt
+            meta['file_corrupt'] = str(self.file_corrupt)
+            db.executemany('INSERT INTO meta VALUES (?,?)', meta.items())
+            db.commit()
+        finally:
+            db.close()
+        os.replace(tmp_file, self.db_file)
+
+    def get_pids(self):
+        """Return an array of pids appearing in the file"""
+        return [row[0] for row in self._db.execute(
+            'SELECT pid FROM lines GROUP BY pid ORDER BY MIN(id)')]
+
+    def new_iter(self, pid=None, stateful=False, trace_only=False):
+        """Return an iterator over the lines of the log file
+
+        The options are as for LogIter.new_iter(), except that raw lines are
+        not in the index.
+        """
+        if pid is None:
+            rows = self._db.execute('SELECT line FROM lines ORDER BY id')
+        else:
+            rows = self._db.execute('SELECT line FROM lines WHERE pid = ? '
+                                    'ORDER BY id', (pid,))
+
+        lines = (cart_logparse.LogLine(row[0]) for row in rows)
+        if trace_only:
+            lines = (line for line in lines if line.trace)
+
+        if stateful:
+            if pid is None:
+                raise cart_logparse.InvalidPid(pid)
+            return cart_logparse.StateIter(lines)
+        return lines
+
+    def _lines(self, query, params):
+        """Return the lines of a query as LogLine objects"""
+        return [cart_logparse.LogLine(row[0]) for row in
+                self._db.execute(query, params)]
+
+    def descriptor_lines(self, descriptor):
+        """Return all lines logged for a descriptor"""
+        return self._lines('SELECT line FROM lines WHERE descriptor = ? '
+                           'ORDER BY id', (descriptor,))
+
+    def rpc_lines(self, rpcid):
+        """Return the lifecycle of a RPC, all lines logged for its rpcid"""
+        return self._lines('SELECT line FROM lines WHERE rpcid = ? '
+                           'ORDER BY id', (rpcid,))
+
+    def errors_by_location(self, level='WARN'):
+        """Return the source locations of lines at level or above
+
+        Returns a list of (file, lineno, count) tuples with the most common
+        locations first.
+        """
+        return list(self._db.execute(
+            'SELECT file, lineno, COUNT(*) AS count FROM lines '
+            'WHERE level <= ? GROUP BY file, lineno ORDER BY count DESC',
+            (cart_logparse.LOG_LEVELS[level],)))
+
+    def close(self):
+        """Close the database"""
+        self._db.close()
+
+def _get_row(line):
+    """Return the values of a line to store in the index"""
+    try:
+        filename = line.filename
+        lineno = line.lineno
+    except AttributeError:
+        filename = None
+        lineno = None
+    try:
+        function = line.function
+    except AttributeError:
+        function = None
+    if line.trace:
+        descriptor = line.descriptor
+    else:
+        descriptor = None
+    # Search the whole line, as the RPC prefix is not part of the message.
+    text = line.get_line()
+    opcode = re_opcode.search(text)
+    if opcode:
+        opcode = opcode.group(1)
+    rpcid = re_rpcid.search(text)
+    if rpcid:
+        rpcid = rpcid.group(1)
+    return (line.pid, line.ts, line.level, line.fac, filename, lineno,
+            function, descriptor, opcode, rpcid, text)
+
+def _print_lines(lines):
+    """Print lines, as cart_logtest would"""
+    for line in lines:
+        print(line.to_str())
+
+def run():
+    """Index a single file, and query it"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', help='index file, default file.sqlite')
+    parser.add_argument('--rebuild',
+                        help='Rebuild the index even if it is current',
+                        action='store_true')
+    parser.add_argument('--desc', help='Show all lines for a descriptor')
+    parser.add_argument('--rpc', help='Show the lifecycle of a rpcid')
+    parser.add_argument('--errors',
+                        help='Show the source locations of lines at a level '
+                        'or above, such as ERR or WARN')
+    parser.add_argument('--check',
+                        help='Run the cart_logtest checks on the index',
+                        action='store_true')
+    parser.add_argument('file', help='input file')
+    args = parser.parse_args()
+
+    index = LogIndex(args.file, db_file=args.db, rebuild=args.rebuild)
+    if args.desc:
+        _print_lines(index.descriptor_lines(args.desc))
+    if args.rpc:
+        _print_lines(index.rpc_lines(args.rpc))
+    if args.errors:
+        for (filename, lineno, count) in index.errors_by_location(args.errors):
+            print('{}:{} {}'.format(filename, lineno, count))
+    if args.check:
+        import cart_logtest # pylint: disable=import-outside-toplevel
+        test_iter = cart_logtest.LogTest(index)
+        try:
+            test_iter.check_log_file(False)
+        except cart_logtest.LogCheckError as error:
+            print(error)
+    index.close()
+    if index.file_corrupt:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    run()
@@ -44,9 +44,16 @@ This provides a way of querying CaRT logfiles for processing.
 """
 
 from collections import OrderedDict
+import array
 import bz2
+import json
+import mmap
 import os
 import re
+import shutil
+import sys
+import tempfile
+import threading
 
 
 class InvalidPid(Exception):
@@ -67,11 +74,78 @@ LOG_LEVELS = {
     'INFO': 8,
     'DBUG': 9}
 
+# Maximum number of fields to remember as not needing anonymising.
+ANON_CACHE_SIZE = 100000
+
+class _LineCache(threading.local):
+    """Caches used by LogLine, kept per thread
+
+    Log files can be checked by several threads at once, so each thread has
+    its own copy of these.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # The fields of the last line to be split.  Checks usually query the
+        # same line several times in a row so keep these around, but only for
+        # one line at a time.
+        self.split_line = None
+        self.split_fields = None
+        # Fields which were found not to need replacing.  These are mostly
+        # the fixed words of log format strings so the set is small, but it
+        # is cleared if it grows too large.
+        self.anon_plain = set()
+
+_line_cache = _LineCache()
+
+# Format version of the line index saved next to large log files.
+INDEX_VERSION = 1
+
 # Make a reverse lookup from log level to name.
 LOG_NAMES = {}
 for (name,value) in LOG_LEVELS.items():
     LOG_NAMES[value] = name
 
+def decode_line(data):
+    """Decode a line of a log file
+
+    Returns a tuple of the line, and if it was valid utf-8.  Invalid lines
+    are decoded as latin-1, which cannot fail.
+    """
+    try:
+        return (data.decode('utf-8'), True)
+    except UnicodeDecodeError:
+        return (data.decode('latin-1'), False)
+
+def _split_preamble(line):
+    """Split a log line, without checking that it is one
+
+    Returns a tuple of the pid, and the fields of the line which are the
+    timestamp, hostname, tag, facility, level and message.
+    """
+    fields = line.split(None, 5)
+    # The tag is NAME[pid/tid/uid] with a four character name.
+    return (int(fields[2][5:-1].split('/')[0]), fields)
+
+def parse_preamble(line):
+    """Parse the preamble of a line of a log file
+
+    This is used by every reader of log files, and parses the fixed format
+    part of each line once.  The line can be str or bytes.
+
+    Returns a tuple of the pid and fields as _split_preamble() does, or None
+    if the line is not a log line.
+    """
+    fields = line.split(None, 5)
+    if len(fields) < 6 or len(fields[0]) != 17:
+        return None
+    # The third character of the timestamp is always a /, this is also the
+    # separator of the pid and tid, as either str or bytes.
+    slash = fields[0][2:3]
+    if slash not in ('/', b'/'):
+        return None
+    return (int(fields[2][5:-1].split(slash)[0]), fields)
+
 # pylint: disable=too-few-public-methods
 class LogRaw():
     """Class for raw (non cart log lines) in cart log files.
@@ -80,6 +154,8 @@ class LogRaw():
     for example mercury logs being sent to the same file.
     """
 
+    __slots__ = ('line', 'trace')
+
     def __init__(self, line):
         self.line = line.rstrip('\n')
         self.trace = False
@@ -99,8 +175,19 @@ class LogLine():
 
     It allows for queries such as 'string in line' which will match against
     the message only, and != which will match the entire line.
+
+    To keep the memory use of a parsed log file close to the size of the file
+    itself each object only holds the original line, the offset of the message
+    within it and the fields needed for iteration.  Facility, function and
+    source location strings are interned, and the message is only split into
+    fields when they are accessed.
     """
 
+    __slots__ = ('_line', '_msg_idx', '_strip_rpc', '_loc', 'pid', 'fac',
+                 'level', 'trace', 'function', 'descriptor',
+                 # Set by StateIter.
+                 'pdesc', 'pparent', 'rpc', 'rpc_opcode')
+
     # Match an address range, a region in memory.
     re_region = re.compile(r"(0|0x[0-9a-f]{1,16})-(0x[0-9a-f]{1,16})")
     # Match a pointer, with optional ) . or , suffix.
@@ -119,28 +206,54 @@ class LogLine():
     # Match DF_CONT
     re_cont = re.compile(r"[0-9a-f]{8}/[0-9a-f]{8}(:?)")
 
-    def __init__(self, line):
-        fields = line.split()
-        # Work out the end of the fixed-width portion, and the beginning of the
-        # message.  The hostname and pid fields are both variable width
-        idx = 29 + len(fields[1]) + len(fields[2])
-        pidtid = fields[2][5:-1]
-        pid = pidtid.split("/")
-        self.pid = int(pid[0])
-        self._preamble = line[:idx]
-        self.fac = fields[3]
+    # All of the above in one expression, in order of precedence, so that
+    # a field can be classified with a single match.  The name of the outer
+    # group which matched is the type of the field.
+    re_anon = re.compile('|'.join([
+        r"(?P<region>(0|0x[0-9a-f]{1,16})-(0x[0-9a-f]{1,16}))",
+        r"(?P<pointer>0x[0-9a-f]{1,16}(?P<pointer_sfx>(\)|\.|\,)?))",
+        r"(?P<pid>pid=(\d+))",
+        r"(?P<uuid>[0-9a-f]{8}(?P<uuid_sfx>:|\,?))",
+        r"(?P<uuid_rank>[0-9,a-f]{8}\[\d+\](?P<uuid_rank_sfx>:?))",
+        r"(?P<uiod>\d{1,20}\.\d{1,20}.(?P<uiod_sfx>\d{1,10}))",
+        r"(?P<rpcid>rpcid=0x[0-9a-f]{1,16})",
+        r"(?P<cont>[0-9a-f]{8}/[0-9a-f]{8}(?P<cont_sfx>:?))"]))
+
+    # Replacement for each type of field, and the group to format it with.
+    anon_formats = {'region': ('0x...-0x...', None),
+                    'pointer': ('0x...{}', 'pointer_sfx'),
+                    'pid': ('pid=<pid>', None),
+                    'uuid': ('uuid{}', 'uuid_sfx'),
+                    'uuid_rank': ('uuid/rank{}', 'uuid_rank_sfx'),
+                    'uiod': ('uoid.{}', 'uiod_sfx'),
+                    'rpcid': ('rpcid=<rpcid>', None),
+                    'cont': ('pool/cont{}', 'cont_sfx')}
+
+    def __init__(self, line, preamble=None):
+        if preamble is None:
+            preamble = _split_preamble(line)
+        (self.pid, fields) = preamble
+        self.fac = sys.intern(fields[3])
         try:
             self.level = LOG_LEVELS[fields[4]]
         except KeyError as error:
             raise InvalidLogFile(fields[4]) from error
 
-        self.ts = fields[0]
-        self._fields = fields[5:]
+        self._line = line
+        # The message starts with the source location, then the function.
+        try:
+            msg = fields[5]
+        except IndexError:
+            msg = ''
+        self._msg_idx = len(line) - len(msg)
+        msg_fields = msg.split(None, 2)
         try:
-            if self._fields[1][-2:] == '()':
+            self._loc = sys.intern(msg_fields[0])
+            fn_str = msg_fields[1]
+            if fn_str[-2:] == '()':
                 self.trace = False
-                self.function = self._fields[1][:-2]
-            elif self._fields[1][-1:] == ')':
+                self.function = sys.intern(fn_str[:-2])
+            elif fn_str[-1:] == ')':
                 self.trace = True
             else:
                 self.trace = False
@@ -148,31 +261,52 @@ class LogLine():
             # Catch truncated log lines.
             self.trace = False
 
-        if self.trace:
-            if self.level == 7 or self.level == 3:
-                if self.fac == 'rpc' or self.fac == 'hg':
-                    del self._fields[2:5]
+        # The RPC trace prefix of rpc and hg lines is not part of the message.
+        self._strip_rpc = self.trace and self.level in (7, 3) and \
+            self.fac in ('rpc', 'hg')
 
         if self.trace:
-            fn_str = self._fields[1]
             start_idx = fn_str.find('(')
-            self.function = fn_str[:start_idx]
+            self.function = sys.intern(fn_str[:start_idx])
             desc = fn_str[start_idx+1:-1]
             if desc == '(nil)':
                 self.descriptor = ''
             else:
                 self.descriptor = desc
-        self._msg = ' '.join(self._fields)
+
+    @property
+    def _fields(self):
+        """The message split into fields"""
+        cache = _line_cache
+        if cache.split_line is self:
+            return cache.split_fields
+        fields = self._line[self._msg_idx:].split()
+        if self._strip_rpc:
+            del fields[2:5]
+        cache.split_fields = fields
+        cache.split_line = self
+        return fields
+
+    @property
+    def _msg(self):
+        """The message with whitespace normalised"""
+        return ' '.join(self._fields)
 
     def to_str(self, mark=False):
         """Convert the object to a string"""
-        pre = self._preamble.split(' ', 3)
+        fields = self._line.split(None, 3)
+        # Work out the end of the fixed-width portion, and the beginning of the
+        # message.  The hostname and pid fields are both variable width
+        idx = 29 + len(fields[1]) + len(fields[2])
+        pre = self._line[:idx].split(' ', 3)
         preamble = ' '.join([pre[0], pre[3]])
         if mark:
             return '{} ** {}'.format(preamble, self._msg)
         return '{}    {}'.format(preamble, self._msg)
 
     def __getattr__(self, attr):
+        if attr == 'ts':
+            return self._line.split(None, 1)[0]
         if attr == 'parent':
             if self._fields[2] == 'Registered':
                 # This is a bit of a hack but handle the case where descriptor
@@ -184,18 +318,22 @@ class LogLine():
                 return self._fields[5]
         if attr == 'filename':
             try:
-                (filename, _) = self._fields[0].split(':')
+                (filename, _) = self._loc.split(':')
                 return filename
-            except (IndexError, ValueError):
+            except (AttributeError, ValueError):
                 pass
         elif attr == 'lineno':
             try:
-                (_, lineno) = self._fields[0].split(':')
+                (_, lineno) = self._loc.split(':')
                 return int(lineno)
-            except (IndexError, ValueError):
+            except (AttributeError, ValueError):
                 pass
         raise AttributeError
 
+    def get_line(self):
+        """Return the line as it was read from the log file"""
+        return self._line
+
     def get_msg(self):
         """Return the message part of a line, stripping up to and
         including the filename"""
@@ -214,44 +352,22 @@ class LogLine():
         # without creating too much output.
 
         fields = []
+        plain = _line_cache.anon_plain
+        fullmatch = self.re_anon.fullmatch
         for entry in self._fields[2:]:
-            field = None
-
-            r = self.re_region.fullmatch(entry)
-            if r:
-                field = '0x...-0x...'
-
-            if not field:
-                r = self.re_pointer.fullmatch(entry)
-                if r:
-                    field = '0x...{}'.format(r.group(1))
-            if not field:
-                r = self.re_pid.fullmatch(entry)
-                if r:
-                    field = 'pid=<pid>'
-            if not field:
-                r = self.re_uuid.fullmatch(entry)
-                if r:
-                    field = 'uuid{}'.format(r.group(1))
-            if not field:
-                r = self.re_uuid_rank.fullmatch(entry)
-                if r:
-                    field = 'uuid/rank{}'.format(r.group(1))
-            if not field:
-                r = self.re_uiod.fullmatch(entry)
-                if r:
-                    field = 'uoid.{}'.format(r.group(1))
-            if not field:
-                r = self.re_rpcid.fullmatch(entry)
-                if r:
-                    field = 'rpcid=<rpcid>'
-            if not field:
-                r = self.re_cont.fullmatch(entry)
-                if r:
-                    field = 'pool/cont{}'.format(r.group(1))
-            if field:
-                fields.append(field)
+            if entry in plain:
+                fields.append(entry)
+                continue
+            match = fullmatch(entry)
+            if match:
+                (anon, group) = self.anon_formats[match.lastgroup]
+                if group:
+                    anon = anon.format(match.group(group))
+                fields.append(anon)
             else:
+                if len(plain) > ANON_CACHE_SIZE:
+                    plain.clear()
+                plain.add(entry)
                 fields.append(entry)
 
         return '{}() {}'.format(self.function, ' '.join(fields))
@@ -429,7 +545,10 @@ class StateIter():
         return self
 
     def __next__(self):
-        line = next(self._l)
+        return self.add_line(next(self._l))
+
+    def add_line(self, line):
+        """Add the descriptor state to a line, and return it"""
 
         if not line.trace:
             line.rpc = False
@@ -491,64 +610,50 @@ class LogIter():
     is rewindable, and there are options for automatically skipping lines.
     """
 
-    def __init__(self, fname, check_encoding=False):
-        """Load a file, and check how many processes have written to it"""
+    def __init__(self, fname, check_encoding=False, save_index=False):
+        """Load a file, and check how many processes have written to it
+
+        The file is read as bytes and each line is decoded as it is parsed.
+        Lines which are not valid utf-8 are reported, decoded as latin-1
+        and file_corrupt is set, so every file has its encoding checked and
+        check_encoding is only accepted for compatibility.
+        """
 
         # Depending on file size either pre-read entire file into memory,
-        # or do a first pass checking the pid list.  This allows the same
-        # iterator to work fast if the file can be kept in memory, or the
-        # same, bug slower if it needs to be re-read each time.
-        #
-        # Try and open the file as utf-8, but if that doesn't work then
-        # find and report the error, then continue with the file open as
-        # latin-1
+        # or memory map the file and index the lines written by each pid.
+        # This allows the same iterator to work fast if the file can be kept
+        # in memory, or the same, but slower if it needs to be re-read each
+        # time.
 
-        # pylint: disable=consider-using-with
-        self._fd = None
+        # pylint: disable=unused-argument
 
         self.file_corrupt = False
 
-        self.bz2 = False
-
-        # Force check encoding for smaller files.
-        i = os.stat(fname)
-        if i.st_size < (1024*1024*5):
-            check_encoding = True
-
-        if fname.endswith('.bz2'):
-            # Allow direct operation on bz2 files.  Supports multiple pids
-            # per file as normal, however does not try and seek to file
-            # positions, rather walks the entire file for each pid.
-            self._fd = bz2.open(fname, 'rt')
-            self.bz2 = True
-        else:
-            if check_encoding:
-                try:
-                    self._fd = open(fname, 'r', encoding='utf-8')
-                    self._fd.read()
-                except UnicodeDecodeError as err:
-                    print('ERROR: Invalid data in server.log on following line')
-                    self._fd = open(fname, 'r', encoding='latin-1')
-                    self._fd.read(err.start - 200)
-                    data = self._fd.read(199)
-                    lines = data.splitlines()
-                    print(lines[-1])
-                    self.file_corrupt = True
-
-                    # This will now work, as the file has been opened in
-                    # latin-1 rather than unicode.
-                self._fd.seek(0)
-            else:
-                self._fd = open(fname, 'r', encoding='utf-8')
+        # Allow direct operation on bz2 files.  Supports multiple pids per
+        # file as normal, the file is decompressed once to a temporary file
+        # which is then indexed like any other large file.
+        self.bz2 = fname.endswith('.bz2')
 
         self.fname = fname
         self._data = []
 
+        # Memory map of the file, and the offsets of the lines of each pid.
+        self._mm = None
+        self._index = {}
+        self._offsets = None
+
+        # pylint: disable=consider-using-with
+        self._fd = open(fname, 'rb')
+
         i = os.fstat(self._fd.fileno())
         self.__from_file = bool(i.st_size > (1024*1024*100)) or self.bz2
 
         if self.__from_file:
-            self._load_pids()
+            self._map_file()
+            if not self._load_index():
+                self._load_pids()
+                if save_index:
+                    self._save_index()
         else:
             self._load_data()
 
@@ -564,19 +669,34 @@ class LogIter():
         self._iter_pid = None
         self._iter_last_index = 0
 
+    def _map_file(self):
+        """Memory map the file, decompressing it first if required"""
+
+        if self.bz2:
+            self._fd.close()
+            # pylint: disable=consider-using-with
+            self._fd = tempfile.TemporaryFile()
+            with bz2.open(self.fname, 'rb') as src:
+                shutil.copyfileobj(src, self._fd)
+            self._fd.flush()
+
+        if os.fstat(self._fd.fileno()).st_size:
+            self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+
     def _load_data(self):
         """Load all data into memory"""
 
         pids = OrderedDict()
 
         index = 0
-        for line in self._fd:
-            fields = line.split(None, 8)
+        for data in self._fd:
+            line = self._decode(data)
+            preamble = parse_preamble(line)
             index += 1
-            if len(fields) < 6 or len(fields[0]) != 17 or fields[0][2] != '/':
+            if preamble is None:
                 self._data.append(LogRaw(line))
             else:
-                l_obj = LogLine(line)
+                l_obj = LogLine(line, preamble)
                 l_pid = l_obj.pid
                 self._data.append(l_obj)
                 if l_pid in pids:
@@ -587,31 +707,99 @@ class LogIter():
                 pids[l_pid]['last_index'] = index
         self._pids = pids
 
+    def _decode(self, data):
+        """Decode a line, reporting it if it is not valid utf-8"""
+        (line, valid) = decode_line(data)
+        if not valid and not self.file_corrupt:
+            print('ERROR: Invalid data in {} on following line'.format(
+                self.fname))
+            print(line.rstrip('\n'))
+            self.file_corrupt = True
+        return line
+
     def _load_pids(self):
-        """Iterate through the file, loading data on pids"""
+        """Iterate through the file, indexing the lines of each pid"""
 
         pids = OrderedDict()
+        index = {}
 
-        index = 0
+        if self._mm is None:
+            self._pids = pids
+            self._index = index
+            return
+
+        line_no = 0
         position = 0
-        for line in self._fd:
-            fields = line.split(None, 8)
-            index += 1
-            if len(fields) < 6 or len(fields[0]) != 17 or fields[0][2] != '/':
+        self._mm.seek(0)
+        for line in iter(self._mm.readline, b''):
+            preamble = parse_preamble(line)
+            line_no += 1
+            if preamble is None:
                 position += len(line)
                 continue
-            pidtid = fields[2][5:-1]
-            pid = pidtid.split("/")
-            l_pid = int(pid[0])
+            l_pid = preamble[0]
             if l_pid in pids:
                 pids[l_pid]['line_count'] += 1
             else:
                 pids[l_pid] = {'line_count': 1,
                                'file_pos': position,
-                               'first_index': index}
-            pids[l_pid]['last_index'] = index
+                               'first_index': line_no}
+                index[l_pid] = array.array('Q')
+            pids[l_pid]['last_index'] = line_no
+            index[l_pid].append(position)
             position += len(line)
         self._pids = pids
+        self._index = index
+
+    def _index_file(self):
+        """Return the name of the index file for the log file"""
+        return '{}.idx'.format(self.fname)
+
+    def _index_header(self):
+        """Return the header identifying the log file an index is for"""
+        i = os.stat(self.fname)
+        return {'version': INDEX_VERSION,
+                'size': i.st_size,
+                'mtime': i.st_mtime_ns,
+                'itemsize': array.array('Q').itemsize}
+
+    def _load_index(self):
+        """Load the line index from a previous run, if there is a valid one
+
+        Returns True if the index was loaded.
+        """
+        header = self._index_header()
+        try:
+            with open(self._index_file(), 'rb') as fd:
+                saved = json.loads(fd.readline())
+                pids = saved.pop('pids')
+                if saved != header:
+                    return False
+                index = {}
+                for (pid, info) in pids:
+                    index[pid] = array.array('Q')
+                    index[pid].fromfile(fd, info['line_count'])
+        except (OSError, ValueError, KeyError, EOFError):
+            return False
+
+        self._pids = OrderedDict(pids)
+        self._index = index
+        return True
+
+    def _save_index(self):
+        """Save the line index next to the log file for later runs"""
+        header = self._index_header()
+        header['pids'] = list(self._pids.items())
+        tmp_file = '{}.tmp'.format(self._index_file())
+        try:
+            with open(tmp_file, 'wb') as fd:
+                fd.write(json.dumps(header).encode('utf-8'))
+                fd.write(b'\n')
+                for pid in self._pids:
+                    self._index[pid].tofile(fd)
+            os.replace(tmp_file, self._index_file())
+        except OSError:
+            pass
 
     def new_iter(self,
                  pid=None,
@@ -633,11 +821,8 @@ class LogIter():
                 raise InvalidPid from error
 
             if self.__from_file:
-                if self.bz2:
-                    self._iter_last_index = self._iter_pid['last_index']
-                else:
-                    self._iter_last_index = self._iter_pid['last_index'] - \
-                                            self._iter_pid['first_index'] + 1
+                # Only the indexed lines of the pid are read.
+                self._iter_last_index = self._iter_pid['line_count']
             else:
                 self._iter_last_index = self._iter_pid['last_index']
 
@@ -660,10 +845,12 @@ class LogIter():
         self._iter_index = 0
         self._iter_count = 0
         if self.__from_file:
-            if self._pid is None or self.bz2:
-                self._fd.seek(0)
+            if self._pid is None:
+                self._offsets = None
+                if self._mm is not None:
+                    self._mm.seek(0)
             else:
-                self._fd.seek(self._iter_pid['file_pos'])
+                self._offsets = iter(self._index[self._pid])
         else:
             self._offset = 0
         return self
@@ -672,13 +859,18 @@ class LogIter():
         """Helper function for __next__"""
 
         if self.__from_file:
-            line = self._fd.readline()
+            if self._mm is None:
+                raise StopIteration
+            if self._offsets is not None:
+                self._mm.seek(next(self._offsets))
+            line = self._mm.readline()
             if not line:
                 raise StopIteration
-            fields = line.split(None, 8)
-            if len(fields) < 6 or len(fields[0]) != 17 or fields[0][2] != '/':
+            line = self._decode(line)
+            preamble = parse_preamble(line)
+            if preamble is None:
                 return LogRaw(line)
-            return LogLine(line)
+            return LogLine(line, preamble)
 
         try:
             line = self._data[self._offset]
@@ -722,4 +914,76 @@ class LogIter():
     def get_pids(self):
         """Return an array of pids appearing in the file"""
         return list(self._pids.keys())
+
+class LogFollower():
+    """Class for reading a CaRT log file while it is being written
+
+    Each call to read_lines() returns the lines appended to the file since the
+    previous call.  Lines are only returned once they are complete, unless the
+    writer has finished.  If the file is truncated or replaced, for example
+    because it has wrapped, then wrapped is set and no more lines are read.
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.file_corrupt = False
+        self.wrapped = False
+        self._fd = None
+        self._partial = b''
+
+    def read_lines(self, final=False):
+        """Return a list of the new lines in the file
+
+        If final is set then the writer has finished, so return any
+        incomplete last line as well.
+        """
+        if self.wrapped:
+            return []
+
+        if self._fd is None:
+            try:
+                # pylint: disable=consider-using-with
+                self._fd = open(self.fname, 'rb')
+            except FileNotFoundError:
+                return []
+
+        try:
+            i = os.stat(self.fname)
+        except FileNotFoundError:
+            i = None
+        if i is None or i.st_ino != os.fstat(self._fd.fileno()).st_ino or \
+           i.st_size < self._fd.tell():
+            self.wrapped = True
+            return []
+
+        data = self._fd.read()
+        if not data and not final:
+            return []
+        data = self._partial + data
+        raw_lines = data.split(b'\n')
+        self._partial = raw_lines.pop()
+        if final and self._partial:
+            raw_lines.append(self._partial)
+            self._partial = b''
+
+        lines = []
+        for raw_line in raw_lines:
+            (line, valid) = decode_line(raw_line)
+            if not valid and not self.file_corrupt:
+                print('ERROR: Invalid data in {} on following line'.format(
+                    self.fname))
+                print(line)
+                self.file_corrupt = True
+            preamble = parse_preamble(line)
+            if preamble is None:
+                lines.append(LogRaw(line))
+            else:
+                lines.append(LogLine(line, preamble))
+        return lines
+
+    def close(self):
+        """Close the file"""
+        if self._fd:
+            self._fd.close()
+            self._fd = None
 # pylint: enable=too-many-instance-attributes
@@ -11,6 +11,12 @@ This provides consistency checking for CaRT log files.
 import sys
 import time
 import argparse
+import contextlib
+import heapq
+import io
+import json
+import multiprocessing
+import threading
 HAVE_TABULATE = True
 try:
     import tabulate
@@ -42,6 +48,20 @@ class ActiveDescriptors(LogCheckError):
 class LogError(LogCheckError):
     """Errors detected in log file"""
 
+class _EndOfLog():
+    """Marks the end of the lines of a pid, with the options to report it"""
+    def __init__(self, show_memleaks, leak_wf):
+        self.show_memleaks = show_memleaks
+        self.leak_wf = leak_wf
+
+class _PidStream():
+    """The state of a pid being checked by LogTest.check_log_lines()"""
+    def __init__(self, checker):
+        self.state = cart_logparse.StateIter(None)
+        self.checker = checker
+        self.capture = ShowCapture()
+        next(checker)
+
 class RegionContig():
     """Class to represent a memory region"""
     def __init__(self, start, end):
@@ -136,6 +156,46 @@ shown_logs = set()
 
 wf = None
 
+class ShowCapture():
+    """Record the output of a log check so it can be replayed later
+
+    This is used when checking in a worker process or in the background, so
+    that the output is reported in the same order as a serial check.  It is
+    also a stream, so stdout can be redirected to it.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.shown = set()
+
+    def show(self, log, line, sev, msg, custom):
+        """Record a call to show_line()"""
+        if log in self.shown:
+            return
+        self.events.append(('show', line, sev, msg, bool(custom)))
+        self.shown.add(log)
+
+    def write(self, text):
+        """Record text written to stdout"""
+        self.events.append(('text', text))
+
+    def flush(self):
+        """Nothing to flush"""
+
+    def replay(self, leak_wf):
+        """Report the recorded output"""
+        for event in self.events:
+            if event[0] == 'text':
+                sys.stdout.write(event[1])
+            else:
+                (_, line, sev, msg, leak) = event
+                show_line(line, sev, msg, custom=leak_wf if leak else None)
+        self.events = []
+
+# When set the output of show_line() in this thread is recorded by this
+# ShowCapture rather than printed.
+_capture = threading.local()
+
 def show_line(line, sev, msg, custom=None):
     """Output a log line in gcc error format"""
 
@@ -146,6 +206,10 @@ def show_line(line, sev, msg, custom=None):
                                         sev,
                                         msg,
                                         line.get_anon_msg())
+    capture = getattr(_capture, 'current', None)
+    if capture is not None:
+        capture.show(log, line, sev, msg, custom)
+        return
     if log in shown_logs:
         return
     print(log)
@@ -155,6 +219,18 @@ def show_line(line, sev, msg, custom=None):
         wf.add(line, sev, msg)
     shown_logs.add(log)
 
+# The number of freed allocations remembered for reporting double frees.
+OLD_REGIONS_SIZE = 100000
+
+def _pointer_key(pointer):
+    """Return a compact dict key for a pointer logged with %p"""
+    if pointer == '(nil)':
+        return 0
+    try:
+        return int(pointer, 16)
+    except ValueError:
+        return pointer
+
 class hwm_counter():
     """Class to track integer values, with high-water mark"""
 
@@ -211,6 +287,12 @@ class LogTest():
         self.log_count = 0
         self._common_shown = False
 
+        # Pids being checked by check_log_lines().
+        self._streams = OrderedDict()
+
+        # Set to a dict to profile the RPCs of each pid, keyed by pid.
+        self.rpc_profiles = None
+
     def __del__(self):
         if not self.quiet and not self._common_shown:
             self.show_common_logs()
@@ -260,24 +342,68 @@ class LogTest():
     def check_log_file(self,
                        abort_on_warning,
                        show_memleaks=True,
-                       leak_wf=None):
-        """Check a single log file for consistency"""
+                       leak_wf=None,
+                       jobs=1):
+        """Check a single log file for consistency
+
+        If jobs is more than one then the pids are checked in parallel by up
+        to that many worker processes, each with its own LogIter.  The results
+        are reported in pid order, as they are when checked serially.
+        """
         to_raise = None
-        for pid in self._li.get_pids():
-            if wf:
-                wf.reset_pending()
-            try:
-                self._check_pid_from_log_file(pid,
-                                              abort_on_warning,
-                                              leak_wf,
-                                              show_memleaks=show_memleaks)
-            except LogCheckError as error:
-                if to_raise is None:
-                    to_raise = error
+        pids = self._li.get_pids()
+        with contextlib.ExitStack() as stack:
+            results = None
+            if jobs > 1 and len(pids) > 1:
+                pool = stack.enter_context(multiprocessing.Pool(
+                    min(jobs, len(pids)),
+                    initializer=_init_check_worker,
+                    initargs=(self._li.fname,)))
+                tasks = [(pid,
+                          abort_on_warning,
+                          show_memleaks,
+                          leak_wf is not None,
+                          self.quiet,
+                          self.hide_fi_calls,
+                          self.fi_location,
+                          self.rpc_profiles is not None) for pid in pids]
+                results = pool.imap(_check_pid_worker, tasks)
+            for pid in pids:
+                if wf:
+                    wf.reset_pending()
+                try:
+                    if results:
+                        self._merge_pid_result(next(results), leak_wf)
+                    else:
+                        self._check_pid_from_log_file(
+                            pid,
+                            abort_on_warning,
+                            leak_wf,
+                            show_memleaks=show_memleaks)
+                except LogCheckError as error:
+                    if to_raise is None:
+                        to_raise = error
         self.show_common_logs()
         if to_raise:
             raise to_raise
 
+    def _merge_pid_result(self, result, leak_wf):
+        """Replay the output of a pid checked in a worker process"""
+        result['capture'].replay(leak_wf)
+        self.log_locs.update(result['log_locs'])
+        self.log_fac.update(result['log_fac'])
+        self.log_levels.update(result['log_levels'])
+        self.log_count += result['log_count']
+        if result['fi_triggered']:
+            self.fi_triggered = True
+            self.fi_location = result['fi_location']
+        if result['file_corrupt']:
+            self._li.file_corrupt = True
+        if result['rpc_profiles']:
+            self.rpc_profiles.update(result['rpc_profiles'])
+        if result['error']:
+            raise result['error']
+
     def check_dfuse_io(self):
         """Parse dfuse i/o"""
 
@@ -306,13 +432,72 @@ class LogTest():
             for cpid in client_pids:
                 print('{}:{}'.format(cpid, client_pids[pid]))
 
-#pylint: disable=too-many-branches,too-many-nested-blocks
     def _check_pid_from_log_file(self,
                                  pid,
                                  abort_on_warning,
                                  leak_wf,
                                  show_memleaks=True):
         """Check a pid from a single log file for consistency"""
+        checker = self._check_pid_lines(pid, abort_on_warning)
+        next(checker)
+        for line in self._li.new_iter(pid=pid, stateful=True):
+            checker.send(line)
+        self._finish_pid(checker, show_memleaks, leak_wf)
+
+    @staticmethod
+    def _finish_pid(checker, show_memleaks, leak_wf):
+        """Complete the checks of a pid, after all its lines are sent"""
+        try:
+            checker.send(_EndOfLog(show_memleaks, leak_wf))
+        except StopIteration:
+            pass
+
+    def check_log_lines(self, lines, abort_on_warning):
+        """Check lines read from a log file that is still being written
+
+        The lines of each pid are checked as they are added, but the results
+        are only reported by finish_log_lines(), in the same order as
+        check_log_file() would.
+        """
+        for line in lines:
+            if isinstance(line, cart_logparse.LogRaw):
+                continue
+            try:
+                stream = self._streams[line.pid]
+            except KeyError:
+                stream = _PidStream(self._check_pid_lines(line.pid,
+                                                          abort_on_warning))
+                self._streams[line.pid] = stream
+            _capture.current = stream.capture
+            try:
+                stream.checker.send(stream.state.add_line(line))
+            finally:
+                _capture.current = None
+
+    def finish_log_lines(self, show_memleaks=True, leak_wf=None):
+        """Report the results of the lines added with check_log_lines()"""
+        to_raise = None
+        for stream in self._streams.values():
+            if wf:
+                wf.reset_pending()
+            try:
+                stream.capture.replay(leak_wf)
+                self._finish_pid(stream.checker, show_memleaks, leak_wf)
+            except LogCheckError as error:
+                if to_raise is None:
+                    to_raise = error
+        self._streams = OrderedDict()
+        self.show_common_logs()
+        if to_raise:
+            raise to_raise
+
+#pylint: disable=too-many-branches,too-many-nested-blocks
+    def _check_pid_lines(self, pid, abort_on_warning):
+        """Check the lines of a pid for consistency
+
+        This is a generator which is sent the lines of the pid, with the
+        descriptor state added by StateIter, followed by an _EndOfLog.
+        """
 
         # Dict of active descriptors.
         active_desc = OrderedDict()
@@ -326,10 +511,14 @@ class LogTest():
         warnings_mode = False
         server_shutdown = False
 
-        regions = OrderedDict()
+        # Active allocations, as a tuple of size and log line text keyed by
+        # _pointer_key().  Lines are only parsed again if they are reported.
+        regions = {}
         memsize = hwm_counter()
 
-        old_regions = {}
+        # Recently freed allocations, as a tuple of allocation and free
+        # lines.
+        old_regions = OrderedDict()
 
         error_files = set()
 
@@ -341,9 +530,14 @@ class LogTest():
         if self.quiet:
             rpc_r = None
         else:
-            rpc_r = rpc_reporting()
+            rpc_r = rpc_reporting(profile=self.rpc_profiles is not None)
 
-        for line in self._li.new_iter(pid=pid, stateful=True):
+        while True:
+            line = yield
+            if isinstance(line, _EndOfLog):
+                show_memleaks = line.show_memleaks
+                leak_wf = line.leak_wf
+                break
             if rpc_r:
                 rpc_r.add_line(line)
             self.save_log_line(line)
@@ -437,8 +631,10 @@ class LogTest():
                         err_count += 1
                     if line.parent not in active_desc:
                         show_line(line, 'error', 'add with bad parent')
-                        if line.parent in regions:
-                            show_line(regions[line.parent], 'NORMAL',
+                        region = regions.get(_pointer_key(line.parent))
+                        if region:
+                            show_line(cart_logparse.LogLine(region[1]),
+                                      'NORMAL',
                                       'used as parent without registering')
                         err_count += 1
                     active_desc[desc] = line
@@ -467,8 +663,10 @@ class LogTest():
                        desc not in active_rpcs:
 
                         show_line(line, 'NORMAL', 'inactive desc')
-                        if line.descriptor in regions:
-                            show_line(regions[line.descriptor], 'NORMAL',
+                        region = regions.get(_pointer_key(line.descriptor))
+                        if region:
+                            show_line(cart_logparse.LogLine(region[1]),
+                                      'NORMAL',
                                       'Used as descriptor without registering')
                         error_files.add(line.filename)
                         err_count += 1
@@ -476,56 +674,66 @@ class LogTest():
                 # is_calloc() doesn't work on truncated output so only test if
                 # there are more than two fields to work with.
                 non_trace_lines += 1
-                if line.is_calloc():
-                    pointer = line.calloc_pointer()
+                # Look at the message type once, rather than using
+                # is_calloc(), is_free() and is_realloc().
+                mem_op = line.get_field(2)
+                if mem_op.startswith('alloc('):
+                    pointer = _pointer_key(line.calloc_pointer())
                     if pointer in regions:
-                        show_line(regions[pointer], 'NORMAL',
+                        show_line(cart_logparse.LogLine(regions[pointer][1]),
+                                  'NORMAL',
                                   'new allocation seen for same pointer')
                         err_count += 1
-                    regions[pointer] = line
-                    memsize.add(line.calloc_size())
-                elif line.is_free():
+                    size = line.calloc_size()
+                    regions[pointer] = (size, line.get_line())
+                    memsize.add(size)
+                elif mem_op == 'free':
                     pointer = line.free_pointer()
                     # If a pointer is freed then automatically remove the
                     # descriptor
                     if pointer in active_desc:
                         del active_desc[pointer]
-                    if pointer in regions:
-                        memsize.subtract(regions[pointer].calloc_size())
-                        old_regions[pointer] = [regions[pointer], line]
-                        del regions[pointer]
+                    key = _pointer_key(pointer)
+                    region = regions.pop(key, None)
+                    if region:
+                        memsize.subtract(region[0])
+                        _add_old_region(old_regions, key, region[1],
+                                        line.get_line())
                     elif pointer != '(nil)':
-                        if pointer in old_regions:
-                            show_line(old_regions[pointer][0], 'ERROR',
-                                      'double-free allocation point')
-                            show_line(old_regions[pointer][1], 'ERROR',
-                                      '1st double-free location')
+                        if key in old_regions:
+                            (alloc_line, free_line) = old_regions[key]
+                            show_line(cart_logparse.LogLine(alloc_line),
+                                      'ERROR', 'double-free allocation point')
+                            show_line(cart_logparse.LogLine(free_line),
+                                      'ERROR', '1st double-free location')
                             show_line(line, 'ERROR',
                                       '2nd double-free location')
                         else:
                             show_line(line, 'HIGH', 'free of unknown memory')
                         err_count += 1
-                elif line.is_realloc():
+                elif mem_op == 'realloc':
                     (new_pointer, old_pointer) = line.realloc_pointers()
                     (new_size, old_size) = line.realloc_sizes()
+                    old_key = _pointer_key(old_pointer)
                     if new_pointer != '(nil)' and old_pointer != '(nil)':
-                        if old_pointer not in regions:
+                        if old_key not in regions:
                             show_line(line, 'HIGH', 'realloc of unknown memory')
                         else:
-                            # Use calloc_size() here as the memory might not
-                            # come from a realloc() call.
-                            exp_sz = regions[old_pointer].calloc_size()
+                            # Use the size of the allocation here as the
+                            # memory might not come from a realloc() call.
+                            exp_sz = regions[old_key][0]
                             if old_size not in (0, exp_sz, new_size):
                                 show_line(line, 'HIGH',
                                           'realloc used invalid old size')
                             memsize.subtract(exp_sz)
-                    regions[new_pointer] = line
+                    regions[_pointer_key(new_pointer)] = (new_size,
+                                                          line.get_line())
                     memsize.add(new_size)
                     if old_pointer not in (new_pointer, '(nil)'):
-                        if old_pointer in regions:
-                            old_regions[old_pointer] = [regions[old_pointer],
-                                                        line]
-                            del regions[old_pointer]
+                        region = regions.pop(old_key, None)
+                        if region:
+                            _add_old_region(old_regions, old_key, region[1],
+                                            line.get_line())
                         else:
                             show_line(line, 'NORMAL',
                                       'realloc of unknown memory')
@@ -534,6 +742,8 @@ class LogTest():
         del active_desc['root']
         if rpc_r:
             rpc_r.report()
+            if self.rpc_profiles is not None:
+                self.rpc_profiles[pid] = rpc_r.get_profile()
 
         # This isn't currently used anyway.
         #if not have_debug:
@@ -555,7 +765,8 @@ class LogTest():
         # once this is stable.
         lost_memory = False
         if show_memleaks:
-            for (_, line) in list(regions.items()):
+            for (_, text) in regions.values():
+                line = cart_logparse.LogLine(text)
                 pointer = line.get_field(-1).rstrip('.')
                 if pointer in active_desc:
                     show_line(line, 'NORMAL', 'descriptor not freed', custom=leak_wf)
@@ -582,8 +793,79 @@ class LogTest():
             raise WarningMode()
 #pylint: enable=too-many-branches,too-many-nested-blocks
 
+def _add_old_region(old_regions, pointer, alloc_line, free_line):
+    """Remember a freed allocation, forgetting the oldest if there are
+    too many"""
+    old_regions.pop(pointer, None)
+    old_regions[pointer] = (alloc_line, free_line)
+    if len(old_regions) > OLD_REGIONS_SIZE:
+        old_regions.popitem(last=False)
+
+# The log iterator of a worker process.
+_worker_li = None
+
+def _init_check_worker(fname):
+    """Open the log file in a worker process"""
+    global _worker_li
+
+    # Only small files are decoded when opened, and the parent has already
+    # reported any errors in those.  Errors found while checking a pid are
+    # reported with the results.
+    with contextlib.redirect_stdout(io.StringIO()):
+        _worker_li = cart_logparse.LogIter(fname)
+
+def _check_pid_worker(task):
+    """Check a pid in a worker process, and return the results"""
+    (pid, abort_on_warning, show_memleaks, leak_wf, quiet, hide_fi_calls,
+     fi_location, rpc_profile) = task
+
+    capture = ShowCapture()
+    _capture.current = capture
+    log_test = LogTest(_worker_li, quiet=quiet)
+    log_test.hide_fi_calls = hide_fi_calls
+    log_test.fi_location = fi_location
+    if rpc_profile:
+        log_test.rpc_profiles = {}
+    # The parent reports the most common logs for all pids.
+    log_test._common_shown = True
+
+    error = None
+    with contextlib.redirect_stdout(capture):
+        try:
+            log_test._check_pid_from_log_file(pid,
+                                              abort_on_warning,
+                                              leak_wf,
+                                              show_memleaks=show_memleaks)
+        except LogCheckError as err:
+            error = err
+
+    _capture.current = None
+    return {'capture': capture,
+            'error': error,
+            'log_locs': log_test.log_locs,
+            'log_fac': log_test.log_fac,
+            'log_levels': log_test.log_levels,
+            'log_count': log_test.log_count,
+            'fi_triggered': log_test.fi_triggered,
+            'fi_location': log_test.fi_location,
+            'rpc_profiles': log_test.rpc_profiles,
+            'file_corrupt': _worker_li.file_corrupt}
+
+# The number of slowest RPCs reported by the RPC profile.
+SLOW_RPC_COUNT = 10
+
+def _percentile(values, percent):
+    """Return a percentile of a sorted list, using the nearest rank"""
+    idx = max(0, -(-len(values) * percent // 100) - 1)
+    return values[idx]
+
 class rpc_reporting():
-    """Class for reporting a summary of RPC states"""
+    """Class for reporting a summary of RPC states
+
+    If profile is set then the timestamps of the lines are also used to
+    measure the latency of each RPC from submission to being sent and
+    completed, and the number of RPCs in flight.
+    """
 
     known_functions = frozenset({'crt_hg_req_send',
                                  'crt_hg_req_destroy',
@@ -593,13 +875,27 @@ class rpc_reporting():
                                  'crt_req_send',
                                  'crt_hg_req_send_cb'})
 
-    def __init__(self):
+    def __init__(self, profile=False):
 
         self._op_state_counters = {}
         self._c_states = {}
         self._c_state_names = set()
         self._current_opcodes = {}
 
+        self._profile = profile
+        # The times of the SUBMITTED and SENT states of RPCs in flight.
+        self._rpc_times = {}
+        # Latencies of completed RPCs for each opcode.
+        self._latencies = {}
+        self._in_flight_hwm = 0
+        # The most RPCs in flight during each second of the log.
+        self._in_flight_series = OrderedDict()
+        # Heap of the slowest RPCs, the sequence number breaks ties.
+        self._slow_rpcs = []
+        self._slow_count = 0
+        self._ts_secs = None
+        self._ts_base = None
+
     def add_line(self, line):
         """Parse a output line"""
 
@@ -652,6 +948,118 @@ class rpc_reporting():
                                                'SUBMITTED':0}
         self._op_state_counters[opcode][rpc_state] += 1
 
+        if self._profile:
+            self._add_time(line, rpc, opcode, rpc_state)
+
+    def _get_time(self, ts):
+        """Return a timestamp in seconds, parsing each second only once"""
+        secs = ts[:-3]
+        if secs != self._ts_secs:
+            self._ts_secs = secs
+            self._ts_base = _ts_to_float(secs + '.00')
+        return self._ts_base + int(ts[-2:]) / 100
+
+    def _add_time(self, line, rpc, opcode, rpc_state):
+        """Record the time of a RPC state transition"""
+        if rpc_state == 'SUBMITTED':
+            self._rpc_times[rpc] = [line.ts, self._get_time(line.ts), None]
+        elif rpc not in self._rpc_times:
+            return
+        elif rpc_state == 'SENT':
+            self._rpc_times[rpc][2] = self._get_time(line.ts)
+            return
+        elif rpc_state == 'COMPLETED':
+            (submit_ts, submitted, sent) = self._rpc_times.pop(rpc)
+            completed = self._get_time(line.ts)
+            # Timestamps are logged in hundredths of a second.
+            latency = {'total': round(completed - submitted, 2)}
+            if sent is not None:
+                latency['submit_sent'] = round(sent - submitted, 2)
+                latency['sent_completed'] = round(completed - sent, 2)
+            if opcode not in self._latencies:
+                self._latencies[opcode] = {'submit_sent': [],
+                                           'sent_completed': [],
+                                           'total': []}
+            for (phase, value) in latency.items():
+                self._latencies[opcode][phase].append(value)
+            latency.update({'opcode': opcode,
+                            'descriptor': rpc,
+                            'submitted': submit_ts})
+            self._slow_count += 1
+            entry = (latency['total'], self._slow_count, latency)
+            if len(self._slow_rpcs) < SLOW_RPC_COUNT:
+                heapq.heappush(self._slow_rpcs, entry)
+            else:
+                heapq.heappushpop(self._slow_rpcs, entry)
+        elif rpc_state == 'DEALLOCATED':
+            # The RPC was not completed, so is no longer in flight.
+            del self._rpc_times[rpc]
+        else:
+            return
+
+        secs = line.ts[:-3]
+        in_flight = len(self._rpc_times)
+        if in_flight > self._in_flight_series.get(secs, -1):
+            self._in_flight_series[secs] = in_flight
+        if in_flight > self._in_flight_hwm:
+            self._in_flight_hwm = in_flight
+
+    def get_profile(self):
+        """Return the RPC profile, as a dict which can be saved as json"""
+        opcodes = {}
+        for (opcode, phases) in sorted(self._latencies.items()):
+            opcodes[opcode] = {}
+            for (phase, values) in phases.items():
+                if not values:
+                    continue
+                values.sort()
+                opcodes[opcode][phase] = {
+                    'count': len(values),
+                    'min': values[0],
+                    'p50': _percentile(values, 50),
+                    'p90': _percentile(values, 90),
+                    'p99': _percentile(values, 99),
+                    'max': values[-1],
+                    'mean': sum(values) / len(values)}
+        slow = [entry[2] for entry in sorted(self._slow_rpcs, reverse=True)]
+        return {'opcodes': opcodes,
+                'in_flight': {'max': self._in_flight_hwm,
+                              'series': self._in_flight_series},
+                'slow': slow}
+
+    def _report_profile(self):
+        """Print the RPC profile to stdout"""
+        profile = self.get_profile()
+        if not profile['opcodes']:
+            return
+
+        table = []
+        for (opcode, phases) in profile['opcodes'].items():
+            for phase in ('submit_sent', 'sent_completed', 'total'):
+                if phase not in phases:
+                    continue
+                stats = phases[phase]
+                table.append([opcode, phase, stats['count']] +
+                             ['{:.2f}'.format(stats[key]) for key in
+                              ('min', 'p50', 'p90', 'p99', 'max')])
+        print('RPC Latency (seconds)')
+        print(tabulate.tabulate(table,
+                                headers=['OPCODE', 'PHASE', 'COUNT', 'MIN',
+                                         'P50', 'P90', 'P99', 'MAX'],
+                                stralign='right'))
+
+        print('Max RPCs in flight: {}'.format(profile['in_flight']['max']))
+
+        table = [[rpc['opcode'],
+                  rpc['descriptor'],
+                  rpc['submitted'],
+                  '{:.2f}'.format(rpc['total'])] for rpc in profile['slow']]
+        print('Slowest RPCs')
+        print(tabulate.tabulate(table,
+                                headers=['OPCODE', 'DESCRIPTOR', 'SUBMITTED',
+                                         'TOTAL'],
+                                stralign='right'))
+
     def report(self):
         """Print report to stdout"""
 
@@ -698,6 +1106,8 @@ class rpc_reporting():
             print(tabulate.tabulate(table,
                                     headers=headers,
                                     stralign='right'))
+            if self._profile:
+                self._report_profile()
 
         for error in errors:
             print(error)
@@ -709,30 +1119,39 @@ def run():
                         help='Summarise dfuse I/O',
                         action='store_true')
     parser.add_argument('--warnings', action='store_true')
+    parser.add_argument('--jobs',
+                        help='Number of processes to check pids with',
+                        type=int,
+                        default=1)
+    parser.add_argument('--save-index',
+                        help='Save a line index next to large log files to '
+                        'speed up later runs',
+                        action='store_true')
+    parser.add_argument('--rpc-profile',
+                        help='Report RPC latencies, and save them to a json '
+                        'file')
     parser.add_argument('file', help='input file')
     args = parser.parse_args()
-    try:
-        log_iter = cart_logparse.LogIter(args.file)
-    except UnicodeDecodeError:
-        # If there is a unicode error in the log file then retry with checks
-        # enabled which should both report the error and run in latin-1 so
-        # perform the log parsing anyway.  The check for log_iter.file_corrupt
-        # later on will ensure that this error does not get logged, then
-        # ignored.
-        # The only possible danger here is the file is simply too big to check
-        # the encoding on, in which case this second attempt would fail with
-        # an out-of-memory error.
-        log_iter = cart_logparse.LogIter(args.file, check_encoding=True)
+    # If there is invalid utf-8 in the log file then LogIter reports it and
+    # parses those lines as latin-1.  The check for log_iter.file_corrupt
+    # later on will ensure that this error does not get logged, then ignored.
+    log_iter = cart_logparse.LogIter(args.file, save_index=args.save_index)
     test_iter = LogTest(log_iter)
+    if args.rpc_profile:
+        test_iter.rpc_profiles = {}
     if args.dfuse:
         test_iter.check_dfuse_io()
     else:
         try:
-            test_iter.check_log_file(args.warnings)
+            test_iter.check_log_file(args.warnings, jobs=args.jobs)
         except LogError:
             print('Errors in log file, ignoring')
         except NotAllFreed:
             print('Memory leaks, ignoring')
+        finally:
+            if args.rpc_profile:
+                with open(args.rpc_profile, 'w') as fd:
+                    json.dump(test_iter.rpc_profiles, fd, indent=2)
     if log_iter.file_corrupt:
         sys.exit(1)
 
@@ -164,6 +164,34 @@ class ContainerAttributeTest(TestWithServers):
             print(traceback.format_exc())
             self.fail("Test was expected to pass but it failed.\n")
 
+    def test_container_bulk_attributes(self):
+        """
+        Test ID: DAOS-1359
+
+        Test description: Set and get a large randomly created container
+        attribute set with the single call bulk API.
+
+        :avocado: tags=all,full_regression
+        :avocado: tags=container,attribute
+        :avocado: tags=bulk_conattribute
+        :avocado: tags=container_attribute
+        """
+        self.add_pool()
+        self.add_container(self.pool)
+        self.container.open()
+        attr_dict = self.create_data_set()
+
+        try:
+            self.container.container.set_attrs(data=attr_dict)
+            attr_value_dict = self.container.container.get_all_attrs()
+            self.verify_list_attr(
+                attr_dict, [name.decode() for name in attr_value_dict])
+            self.verify_get_attr(attr_dict, attr_value_dict)
+        except DaosApiError as excep:
+            print(excep)
+            print(traceback.format_exc())
+            self.fail("Test was expected to pass but it failed.\n")
+
     def test_container_attribute(self):
         """
         Test basic container attribute tests.
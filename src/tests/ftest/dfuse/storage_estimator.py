@@ -0,0 +1,233 @@
+#!/usr/bin/python3
+"""
+  (C) Copyright 2022 Intel Corporation.
+
+  SPDX-License-Identifier: BSD-2-Clause-Patent
+"""
+import csv
+import os
+import re
+import shutil
+import subprocess
+import time
+
+from agent_utils import include_local_host
+from apricot import TestWithoutServers
+from dfuse_test_base import DfuseTestBase
+from io_utilities import DirTree
+
+SIZE_UNITS = {'': 0, 'K': 1, 'M': 2, 'G': 3, 'T': 4, 'P': 5}
+
+
+class StorageEstimatorBase(TestWithoutServers):
+    """Methods shared by the storage estimator tests.
+
+    :avocado: recursive
+    """
+
+    def _run_estimator(self, args):
+        """Run daos_storage_estimator.py and measure it.
+
+        Args:
+            args (list): arguments of daos_storage_estimator.py
+
+        Returns:
+            tuple: elapsed seconds, peak resident memory in KiB and stdout
+
+        """
+        command = [os.path.join(self.bin, "daos_storage_estimator.py")] + args
+        self.log.info("Running %s", " ".join(command))
+
+        start = time.time()
+        with subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                universal_newlines=True) as proc:
+            stdout = proc.stdout.read()
+            # wait4() returns the resource usage of this child only
+            _, status, rusage = os.wait4(proc.pid, 0)
+            if os.WIFSIGNALED(status):
+                proc.returncode = -os.WTERMSIG(status)
+            else:
+                proc.returncode = os.WEXITSTATUS(status)
+        elapsed = time.time() - start
+
+        if proc.returncode != 0:
+            self.log.info(stdout)
+            self.fail("{} failed with rc {}".format(command, proc.returncode))
+
+        return elapsed, rusage.ru_maxrss, stdout
+
+    def _create_tree(self, root, height, subdirs_per_node, files_per_node):
+        """Create a synthetic directory tree.
+
+        Returns:
+            str: path of the directory tree
+
+        """
+        tree = DirTree(root, height, subdirs_per_node, files_per_node)
+        tree.set_logger(self.log.info)
+
+        return tree.create()
+
+    def _write_inventory(self, tree_path, file_name):
+        """Write a per-file CSV inventory of a directory tree."""
+        with open(file_name, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["path", "type", "size"])
+            for root, dirs, files in os.walk(tree_path):
+                for name in dirs:
+                    writer.writerow([os.path.join(root, name), "d", 4096])
+                for name in files:
+                    path = os.path.join(root, name)
+                    item_type = "l" if os.path.islink(path) else "f"
+                    writer.writerow([path, item_type, os.lstat(path).st_size])
+
+    def _get_scm_total(self, stdout):
+        """Get the SCM total in bytes from the estimator report."""
+        match = re.search(r"scm_total\s*:\s*([\d.]+)\s*([KMGTP]?)", stdout)
+        if match is None:
+            self.fail("No scm_total in the estimator output")
+
+        return float(match.group(1)) * pow(1024, SIZE_UNITS[match.group(2)])
+
+
+class StorageEstimatorBenchmark(StorageEstimatorBase):
+    """Storage estimator benchmark test.
+
+    The benchmark only scans local directory trees, so no DAOS server is
+    started for it.
+
+    :avocado: recursive
+    """
+
+    def test_estimator_benchmark(self):
+        """Test Description:
+            Time explore_fs, read_yaml and read_csv on synthetic directory
+            trees of growing size and record their peak memory. The results
+            are saved in the storage_estimator_benchmark.csv file of the test
+            output directory. The test fails if any run is slower than
+            max_seconds_per_entry times the number of entries.
+
+        :avocado: tags=all,manual
+        :avocado: tags=hw,small
+        :avocado: tags=dfuse
+        :avocado: tags=storage_estimator_benchmark
+        """
+        trees = self.params.get("trees", "/run/benchmark/*")
+        max_seconds_per_entry = self.params.get(
+            "max_seconds_per_entry", "/run/benchmark/*")
+        tree_root = self.params.get("tree_root", "/run/benchmark/*", self.tmp)
+
+        runs = [
+            ("explore_fs", ["explore_fs"]),
+            ("explore_fs_average", ["explore_fs", "-x"]),
+            ("explore_fs_histogram", ["explore_fs", "-H"]),
+            ("explore_fs_workers", ["explore_fs", "-w", "8"]),
+        ]
+        results = []
+
+        for height, subdirs_per_node, files_per_node in trees:
+            tree_path = self._create_tree(
+                tree_root, height, subdirs_per_node, files_per_node)
+            entries = sum(len(dirs) + len(files)
+                          for _, dirs, files in os.walk(tree_path))
+            config_file = os.path.join(self.tmp, "estimator_config.json")
+            inventory_file = os.path.join(self.tmp, "estimator_inventory.csv")
+
+            try:
+                tree_runs = [(name, args + [tree_path])
+                             for name, args in runs]
+                tree_runs.append(
+                    ("export_json", ["explore_fs", "-H", "-o", config_file,
+                                     tree_path]))
+                tree_runs.append(("read_yaml", ["read_yaml", config_file]))
+                self._write_inventory(tree_path, inventory_file)
+                tree_runs.append(
+                    ("read_csv_per_file",
+                     ["read_csv", "--per-file", inventory_file]))
+
+                for name, args in tree_runs:
+                    elapsed, peak_rss, _ = self._run_estimator(args)
+                    self.log.info(
+                        "%-22s %10d entries %10.2f s %10d KiB",
+                        name, entries, elapsed, peak_rss)
+                    results.append([name, entries, elapsed, peak_rss])
+            finally:
+                shutil.rmtree(tree_path)
+
+        with open(os.path.join(self.outputdir,
+                               "storage_estimator_benchmark.csv"),
+                  "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["run", "entries", "seconds", "peak_rss_kib"])
+            writer.writerows(results)
+
+        slow_runs = [result for result in results
+                     if result[2] > max_seconds_per_entry * result[1]]
+        if slow_runs:
+            self.fail("Storage estimator runs slower than expected: {}".format(
+                slow_runs))
+
+
+class StorageEstimator(DfuseTestBase, StorageEstimatorBase):
+    # pylint: disable=too-many-ancestors
+    """Storage estimator accuracy test.
+
+    :avocado: recursive
+    """
+
+    def test_estimator_accuracy(self):
+        """Test Description:
+            Create a synthetic directory tree in a POSIX container through
+            dfuse and compare the SCM space used by the VOS pools with the
+            SCM estimation of explore_fs for the same tree.
+
+        :avocado: tags=all,manual
+        :avocado: tags=hw,small
+        :avocado: tags=dfuse
+        :avocado: tags=storage_estimator_accuracy
+        """
+        height = self.params.get("height", "/run/accuracy/*")
+        subdirs_per_node = self.params.get(
+            "subdirs_per_node", "/run/accuracy/*")
+        files_per_node = self.params.get("files_per_node", "/run/accuracy/*")
+        min_ratio = self.params.get("min_ratio", "/run/accuracy/*")
+        max_ratio = self.params.get("max_ratio", "/run/accuracy/*")
+
+        self.add_pool(connect=False)
+        self.add_container(self.pool)
+        # The tree is created and scanned with local file operations, so
+        # mount the container on the local host.
+        self.start_dfuse(include_local_host(None), self.pool, self.container)
+
+        self.pool.get_info()
+        num_shards = self.pool.info.pi_ntargets
+        scm_free_before = self.pool.get_pool_free_space("scm")
+
+        tree_path = self._create_tree(
+            self.dfuse.mount_dir.value, height, subdirs_per_node,
+            files_per_node)
+        scm_used = scm_free_before - self.pool.get_pool_free_space("scm")
+
+        # the estimation of an empty directory is the pool and container
+        # overhead that was already allocated before creating the tree
+        empty_path = os.path.join(self.tmp, "estimator_empty")
+        os.makedirs(empty_path, exist_ok=True)
+        args = ["explore_fs", "-n", str(num_shards)]
+        _, _, stdout = self._run_estimator(args + [tree_path])
+        _, _, empty_stdout = self._run_estimator(args + [empty_path])
+        estimation = self._get_scm_total(stdout) - \
+            self._get_scm_total(empty_stdout)
+
+        self.pool.display_pool_daos_space("after creating the tree")
+        self.log.info("SCM used: %d bytes, SCM estimated: %d bytes",
+                      scm_used, estimation)
+
+        if scm_used <= 0:
+            self.fail("No SCM space used by the directory tree")
+
+        ratio = estimation / scm_used
+        self.log.info("Estimation ratio: %.2f", ratio)
+        if not min_ratio <= ratio <= max_ratio:
+            self.fail("Estimation ratio {:.2f} out of [{}, {}]".format(
+                ratio, min_ratio, max_ratio))
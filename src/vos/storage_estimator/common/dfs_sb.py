@@ -6,11 +6,19 @@
 '''
 
 import os
+import json
 import ctypes
 
-from pydaos.raw import daos_cref
 from storage_estimator.vos_structures import ValType, Overhead, AKey, VosValue, DKey, VosObject
 
+# bump when the layout of the cached data changes
+CACHE_VERSION = 1
+CACHE_ENV = 'DAOS_STORAGE_ESTIMATOR_CACHE'
+# reported when the VERSION file of the installation cannot be read
+UNKNOWN_VERSION = '0.0.0'
+# libraries the cached data is read from
+CACHED_LIBS = ['daos_srv/libvos_size.so', 'libdfs.so']
+
 header = '''---
 # Sample conflig file DFS files and directories
 num_shards: 1000
@@ -76,20 +84,10 @@ def _build_values(count=1, size=1, aligned='Yes'):
     return values
 
 
-def _print_akey(iod, overhead='meta'):
-    iov_buf = iod.iod_name.iov_buf
-    iov_buf_len = iod.iod_name.iov_buf_len
-    akey_str = ctypes.string_at(iov_buf, iov_buf_len)
-
-    if iod.iod_type == 1:
-        iod_type = 'single_value'
-
-    if iod.iod_type == 2:
-        iod_type = 'array'
+def _print_akey(akey_layout, overhead='meta'):
+    values = _build_values(akey_layout['count'], akey_layout['size'])
 
-    values = _build_values(int(iod.iod_nr), int(iod.iod_size))
-
-    key = akey_str.lower().decode('utf-8')
+    key = akey_layout['key'].lower()
 
     akey = '''
 {0}: &{1}
@@ -99,7 +97,8 @@ def _print_akey(iod, overhead='meta'):
   overhead: {3}
   value_type: {4}
   values: [{5}]
-'''.format(key, key, iov_buf_len, overhead, iod_type, values)
+'''.format(key, key, akey_layout['key_size'], overhead,
+           akey_layout['value_type'], values)
 
     return key, akey
 
@@ -116,9 +115,8 @@ def _list_2_str(values):
     return values_str
 
 
-def _print_dkey(dkey, akeys):
-    dkey_str = ctypes.string_at(dkey.iov_buf, dkey.iov_buf_len)
-    key = dkey_str.lower().decode('utf-8')
+def _print_dkey(layout, akeys):
+    key = layout['dkey'].lower()
 
     buf = '''
 {0}: &dfs_sb_metadata
@@ -127,7 +125,7 @@ def _print_dkey(dkey, akeys):
   size: {1}
   overhead: meta
   akeys: {2}
-'''.format(key, dkey.iov_len, _list_2_str(akeys))
+'''.format(key, layout['dkey_size'], _list_2_str(akeys))
 
     return buf
 
@@ -148,53 +146,44 @@ dfs_inode: &dfs_inode
     return buf
 
 
-def _print_dfs(dkey, iods, akey_count, dfs_entry_key_size, dfs_entry_size):
+def _print_dfs(layout):
     akeys = []
     buf = ''
 
-    for i in range(0, akey_count.value):
-        key, akey_str = _print_akey(iods[i])
+    for akey_layout in layout['akeys']:
+        key, akey_str = _print_akey(akey_layout)
         akeys.append(key)
         buf += akey_str
 
-    buf += _print_dkey(dkey, akeys)
-    buf += _print_dfs_inode(dfs_entry_key_size.value, dfs_entry_size.value)
+    buf += _print_dkey(layout, akeys)
+    buf += _print_dfs_inode(layout['entry_key_size'], layout['entry_size'])
 
     return buf
 
 
-def _create_akey(iod):
-    iov_buf = iod.iod_name.iov_buf
-    iov_buf_len = iod.iod_name.iov_buf_len
-    key = ctypes.string_at(iov_buf, iov_buf_len)
-
-    if iod.iod_type == 1:
+def _create_akey(akey_layout):
+    if akey_layout['value_type'] == ValType.SINGLE.value:
         iod_type = ValType.SINGLE
-
-    if iod.iod_type == 2:
+    else:
         iod_type = ValType.ARRAY
 
     overhead = Overhead.META
     akey = AKey(
-        key=key.decode('utf-8'),
+        key=akey_layout['key'],
         value_type=iod_type,
         overhead=overhead)
-    value = VosValue(
-        count=int(
-            iod.iod_nr), size=int(
-            iod.iod_size))
+    value = VosValue(count=akey_layout['count'], size=akey_layout['size'])
     akey.add_value(value)
 
     return akey
 
 
-def _parse_dfs_sb_dkey(dkey_raw, iods, akey_count):
-    key = ctypes.string_at(dkey_raw.iov_buf, dkey_raw.iov_buf_len)
+def _parse_dfs_sb_dkey(layout):
     overhead = Overhead.META
-    dkey = DKey(key=key.decode('utf-8'), overhead=overhead)
+    dkey = DKey(key=layout['dkey'], overhead=overhead)
 
-    for i in range(0, akey_count.value):
-        akey = _create_akey(iods[i])
+    for akey_layout in layout['akeys']:
+        akey = _create_akey(akey_layout)
         dkey.add_value(akey)
 
     return dkey
@@ -214,6 +203,22 @@ def _parse_dfs_akey_inode(dfs_entry_key_size, dfs_entry_size):
     return akey
 
 
+def _get_iod_layout(iod):
+    key = ctypes.string_at(iod.iod_name.iov_buf, iod.iod_name.iov_buf_len)
+
+    if iod.iod_type == 1:
+        value_type = ValType.SINGLE.value
+
+    if iod.iod_type == 2:
+        value_type = ValType.ARRAY.value
+
+    return {'key': key.decode('utf-8'),
+            'key_size': iod.iod_name.iov_buf_len,
+            'value_type': value_type,
+            'count': int(iod.iod_nr),
+            'size': int(iod.iod_size)}
+
+
 class STR_BUFFER(ctypes.Structure):
     _fields_ = [("status", ctypes.c_int),
                 ("str_len", ctypes.c_size_t),
@@ -226,12 +231,9 @@ class BASE_CLASS():
         self._lib = self._load_lib(lib_name)
 
     def _load_lib(self, lib_name):
-        current_path = os.path.dirname(os.path.abspath(__file__))
         try:
-            lib_path = os.path.join(current_path, '../../..')
-
             libdfs = ctypes.CDLL(
-                os.path.join(lib_path, lib_name),
+                os.path.join(_get_lib_path(), lib_name),
                 mode=ctypes.DEFAULT_MODE)
 
         except OSError as err:
@@ -244,11 +246,12 @@ class BASE_CLASS():
 
 class VOS_SIZE(BASE_CLASS):
     def __init__(self):
-        super().__init__('daos_srv/libvos_size.so')
         self._data = STR_BUFFER()
+        super().__init__('daos_srv/libvos_size.so')
 
     def __del__(self):
-        self._lib.d_free_string(ctypes.byref(self._data))
+        if hasattr(self, '_lib'):
+            self._lib.d_free_string(ctypes.byref(self._data))
 
     def get_vos_size_str(self, alloc_overhead, vospath):
         """vospath - mount point of daos. Default is /mnt/daos"""
@@ -277,6 +280,10 @@ class FREE_DFS_SB(BASE_CLASS):
 
 class DFS_SB(BASE_CLASS):
     def __init__(self):
+        # pydaos needs the DAOS client libraries, only import it when the
+        # layout is not cached.
+        from pydaos.raw import daos_cref  # pylint: disable=import-outside-toplevel
+
         super().__init__('libdfs.so')
         self._dkey = daos_cref.IOV()
         self._iods = ctypes.pointer(daos_cref.DaosIODescriptor())
@@ -302,46 +309,167 @@ class DFS_SB(BASE_CLASS):
             raise Exception(
                 'failed to retrieve the DFS Super Block. RC: {0}'.format(ret))
 
-    def get_dfs_str(self):
+    def get_layout(self):
         if not self._ready:
             self._dfs_get_sb_layout()
-        return _print_dfs(
-            self._dkey,
-            self._iods,
-            self._akey_count,
-            self._dfs_entry_key_size,
-            self._dfs_entry_size)
-
-    def get_dfs_sb_dkey(self):
-        if not self._ready:
-            self._dfs_get_sb_layout()
-        return _parse_dfs_sb_dkey(self._dkey, self._iods, self._akey_count)
 
-    def get_dfs_inode_akey(self):
-        if not self._ready:
-            self._dfs_get_sb_layout()
-        return _parse_dfs_akey_inode(
-            self._dfs_entry_key_size.value,
-            self._dfs_entry_size.value)
+        dkey = ctypes.string_at(self._dkey.iov_buf, self._dkey.iov_buf_len)
+        akeys = []
+        for i in range(0, self._akey_count.value):
+            akeys.append(_get_iod_layout(self._iods[i]))
 
+        return {'dkey': dkey.decode('utf-8'),
+                'dkey_size': self._dkey.iov_len,
+                'akeys': akeys,
+                'entry_key_size': self._dfs_entry_key_size.value,
+                'entry_size': self._dfs_entry_size.value}
 
-def print_daos_version():
+
+class STRUCTURES_CACHE():
+    """On-disk cache of the VOS structure sizes and of the DFS layout
+
+    The cache avoids loading libvos_size.so and libdfs.so on every run and
+    allows running the estimator on hosts without the DAOS server libraries,
+    by copying the cache files from a host where DAOS is installed.
+
+    The cache files are named after the DAOS version. When the version is
+    unknown, the size and mtime of the libraries are added to the name if
+    they are installed, so that different builds do not share a cache file.
+    """
+
+    def __init__(self):
+        self._path = os.environ.get(
+            CACHE_ENV,
+            os.path.join(os.path.expanduser('~'), '.cache',
+                         'daos_storage_estimator'))
+        self._daos_version = _get_cache_version()
+
+    def _get_file_name(self, name):
+        return os.path.join(
+            self._path, '{0}_{1}.json'.format(name, self._daos_version))
+
+    def load(self, name, key=''):
+        file_name = self._get_file_name(name)
+        try:
+            with open(file_name, 'r') as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        if data.get('cache_version') != CACHE_VERSION:
+            return None
+        if data.get('daos_version') != self._daos_version:
+            return None
+
+        value = data.get('entries', {}).get(key)
+        if value is not None:
+            print('  Using cache file {0}'.format(file_name))
+
+        return value
+
+    def store(self, name, value, key=''):
+        file_name = self._get_file_name(name)
+        try:
+            with open(file_name, 'r') as cache_file:
+                data = json.load(cache_file)
+            if data.get('cache_version') != CACHE_VERSION:
+                data = {}
+        except (OSError, ValueError):
+            data = {}
+
+        data['cache_version'] = CACHE_VERSION
+        data['daos_version'] = self._daos_version
+        data.setdefault('entries', {})[key] = value
+
+        # a cache that cannot be written is not an error
+        try:
+            os.makedirs(self._path, exist_ok=True)
+            tmp_name = '{0}.{1}'.format(file_name, os.getpid())
+            with open(tmp_name, 'w') as cache_file:
+                json.dump(data, cache_file)
+            os.replace(tmp_name, file_name)
+        except OSError:
+            pass
+
+
+_dfs_layout = None
+
+
+def _get_lib_path():
+    current_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(current_path, '../../..')
+
+
+def _get_cache_version():
+    daos_version = get_daos_version()
+    if daos_version != UNKNOWN_VERSION:
+        return daos_version
+
+    stamps = [daos_version]
+    for lib_name in CACHED_LIBS:
+        try:
+            lib_stat = os.stat(os.path.join(_get_lib_path(), lib_name))
+        except OSError:
+            # no library to tell builds apart, as on hosts using a copied cache
+            return daos_version
+        stamps.append('{0}-{1}'.format(lib_stat.st_size, lib_stat.st_mtime_ns))
+
+    return '_'.join(stamps)
+
+
+def get_daos_version():
     try:
-        current_path = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(current_path, '../../../daos/VERSION'),
+        with open(os.path.join(_get_lib_path(), 'daos/VERSION'),
                   'r') as version_file:
             daos_version = version_file.read().rstrip()
     except OSError:
-        daos_version = '0.0.0'
+        daos_version = UNKNOWN_VERSION
 
-    print('Using DAOS version: {0}'.format(daos_version))
+    return daos_version
+
+
+def print_daos_version():
+    print('Using DAOS version: {0}'.format(get_daos_version()))
+
+
+def get_vos_size_str(alloc_overhead, vospath):
+    cache = STRUCTURES_CACHE()
+    vos_str = cache.load('vos_size', str(alloc_overhead))
+    if vos_str is not None:
+        print('  Reading VOS structures from cache')
+        return vos_str
+
+    vos_size = VOS_SIZE()
+    vos_str = vos_size.get_vos_size_str(alloc_overhead, vospath)
+    cache.store('vos_size', vos_str, str(alloc_overhead))
+
+    return vos_str
+
+
+def get_dfs_layout():
+    global _dfs_layout
+
+    if _dfs_layout is not None:
+        return _dfs_layout
+
+    cache = STRUCTURES_CACHE()
+    layout = cache.load('dfs_sb')
+    if layout is None:
+        dfs_sb = DFS_SB()
+        layout = dfs_sb.get_layout()
+        cache.store('dfs_sb', layout)
+
+    _dfs_layout = layout
+
+    return layout
 
 
 def get_dfs_sb_obj():
     try:
-        dfs_sb = DFS_SB()
-        dkey = dfs_sb.get_dfs_sb_dkey()
-        dfs_inode = dfs_sb.get_dfs_inode_akey()
+        layout = get_dfs_layout()
+        dkey = _parse_dfs_sb_dkey(layout)
+        dfs_inode = _parse_dfs_akey_inode(
+            layout['entry_key_size'], layout['entry_size'])
     except Exception as err:
         raise Exception(
             'Failed to get the DFS superblock VOS object: {0}'.format(err))
@@ -358,8 +486,9 @@ def get_dfs_sb_obj():
 
 def get_dfs_inode_akey():
     try:
-        dfs_sb = DFS_SB()
-        akey = dfs_sb.get_dfs_inode_akey()
+        layout = get_dfs_layout()
+        akey = _parse_dfs_akey_inode(
+            layout['entry_key_size'], layout['entry_size'])
     except Exception as err:
         raise Exception('failed to retrieve to DFS inode: {0}'.format(err))
 
@@ -368,8 +497,7 @@ def get_dfs_inode_akey():
 
 def get_dfs_sb():
     try:
-        dfs_sb = DFS_SB()
-        buf = dfs_sb.get_dfs_str()
+        buf = _print_dfs(get_dfs_layout())
     except Exception as err:
         raise Exception('failed to retrieve DFS Superblock: {0}'.format(err))
 
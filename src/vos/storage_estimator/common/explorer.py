@@ -7,10 +7,14 @@
 
 import os
 import copy
+import json
 import sys
+import bisect
+import threading
+from collections import deque
 
 from storage_estimator.vos_structures import VosObject, AKey, DKey, Container, VosValue, Overhead, ValType, KeyType
-from storage_estimator.util import CommonBase, ObjectClass
+from storage_estimator.util import CommonBase, ObjectClass, FILE_SIZES
 
 
 class FileInfo():
@@ -31,6 +35,15 @@ class Entry():
         return FileInfo(file_size)
 
 
+class SnapshotEntry(Entry):
+    def __init__(self, name, path, size):
+        super().__init__(name, path)
+        self._size = size
+
+    def stat(self, follow_symlinks):
+        return FileInfo(self._size)
+
+
 class AverageFS(CommonBase):
     def __init__(self, arg):
         super().__init__()
@@ -139,6 +152,156 @@ class AverageFS(CommonBase):
         self._total_files += count_files
 
 
+class FileHistogram(CommonBase):
+    def __init__(self):
+        super().__init__()
+        # the last bucket holds the files bigger than the last FILE_SIZES
+        self._bounds = [self._get_bucket_bound(size) for size in FILE_SIZES]
+        self._file_counts = [0] * (len(self._bounds) + 1)
+        self._file_sizes = [0] * (len(self._bounds) + 1)
+        self._entry_names = {}
+        self._symlink_names = {}
+        self._symlink_size = 0
+        self._count_dirs = 0
+
+    def _get_bucket_bound(self, size):
+        return int(size[:-1]) * pow(1024, ' kmgt'.index(size[-1]))
+
+    def _add_name(self, names, name_size):
+        names[name_size] = names.get(name_size, 0) + 1
+
+    def add_file(self, file_size, name_size):
+        idx = bisect.bisect_left(self._bounds, file_size)
+        self._file_counts[idx] += 1
+        self._file_sizes[idx] += file_size
+        self._add_name(self._entry_names, name_size)
+
+    def add_entry(self, name_size):
+        self._add_name(self._entry_names, name_size)
+
+    def add_symlink(self, link_size, name_size):
+        self._symlink_size += link_size
+        self._add_name(self._symlink_names, name_size)
+
+    def add_dir_obj(self):
+        self._count_dirs += 1
+
+    def merge(self, histogram):
+        for idx, count in enumerate(histogram._file_counts):
+            self._file_counts[idx] += count
+            self._file_sizes[idx] += histogram._file_sizes[idx]
+        for name_size, count in histogram._entry_names.items():
+            self._entry_names[name_size] = self._entry_names.get(
+                name_size, 0) + count
+        for name_size, count in histogram._symlink_names.items():
+            self._symlink_names[name_size] = self._symlink_names.get(
+                name_size, 0) + count
+        self._symlink_size += histogram._symlink_size
+        self._count_dirs += histogram._count_dirs
+
+    def _spread_names(self, names):
+        # split the average number of entries per directory across the name
+        # sizes, proportionally to the histogram (largest remainder)
+        total = sum(names.values())
+        if total == 0:
+            return []
+
+        per_dir = total // self._count_dirs
+        per_dir += (total % self._count_dirs) > 0
+
+        quotas = {}
+        for name_size, count in names.items():
+            quotas[name_size] = count * per_dir // total
+
+        left = per_dir - sum(quotas.values())
+        by_remainder = sorted(
+            names, key=lambda size: (-(names[size] * per_dir % total), size))
+        for name_size in by_remainder[:left]:
+            quotas[name_size] += 1
+
+        return [(name_size, count)
+                for name_size, count in sorted(quotas.items()) if count]
+
+    def fill_dfs(self, dfs):
+        for count, total_size in zip(self._file_counts, self._file_sizes):
+            if count:
+                dfs.create_file_obj(total_size // count, count)
+
+        if self._count_dirs == 0:
+            return
+
+        oid = dfs.create_dir_obj(self._count_dirs)
+        for name_size, count in self._spread_names(self._entry_names):
+            self._debug(
+                'adding {0} entries of name size {1} per directory'.format(
+                    count, name_size))
+            dfs.add_dummy(oid, 'x' * name_size, count)
+
+        count_symlinks = sum(self._symlink_names.values())
+        if count_symlinks:
+            link_size = self._symlink_size // count_symlinks
+            for name_size, count in self._spread_names(self._symlink_names):
+                self._debug(
+                    'adding {0} symlinks of name size {1} per directory'.format(
+                        count, name_size))
+                dfs.add_symlink(oid, 'x' * name_size, link_size, count)
+
+        dfs.close_dir_obj(oid)
+
+
+class HistogramFS(CommonBase):
+    def __init__(self, oclass):
+        super().__init__()
+        self._dfs = DFS(oclass)
+        self._histogram = FileHistogram()
+
+    def set_verbose(self, verbose):
+        self._verbose = verbose
+        self._dfs.set_verbose(verbose)
+        self._histogram.set_verbose(verbose)
+
+    def set_dfs_inode(self, akey):
+        self._dfs.set_dfs_inode(akey)
+
+    def set_io_size(self, io_size):
+        self._dfs.set_io_size(io_size)
+
+    def set_chunk_size(self, chunk_size):
+        self._dfs.set_chunk_size(chunk_size)
+
+    def set_dfs_file_meta(self, dkey):
+        self._dfs.set_dfs_file_meta(dkey)
+
+    def get_histogram(self):
+        return self._histogram
+
+    def set_histogram(self, histogram):
+        self._check_value_type(histogram, FileHistogram)
+        self._histogram = histogram
+
+    def add_file(self, file_size, name_size):
+        self._histogram.add_file(file_size, name_size)
+
+    def add_dir(self, name_size):
+        self._histogram.add_entry(name_size)
+        self._histogram.add_dir_obj()
+
+    def add_symlink(self, link_size, name_size):
+        self._histogram.add_symlink(link_size, name_size)
+
+    def get_dfs(self):
+        # the entries need at least one directory
+        if self._histogram._count_dirs == 0:
+            self._histogram.add_dir_obj()
+
+        dfs = self._dfs.create_partial()
+        self._histogram.fill_dfs(dfs)
+        self._debug('Gloabal Stripe Stats')
+        dfs._all_ec_stats.show()
+
+        return dfs
+
+
 class CellStats(CommonBase):
     def __init__(self, verbose=False):
         super().__init__()
@@ -168,6 +331,12 @@ class DFS(CommonBase):
         self._all_ec_stats = CellStats()
         self._oclass = oclass
 
+        # identical items are stored once with a count, indexed by shape
+        self._entries = {}
+        self._symlink_akeys = {}
+        self._file_shapes = {}
+        self._dir_shapes = {}
+
         self._dkey0 = self._create_default_dkey0()
         self._dfs_inode_akey = self._create_default_inode_akey()
 
@@ -177,23 +346,65 @@ class DFS(CommonBase):
 
     def set_io_size(self, io_size):
         self._io_size = io_size
+        self._file_shapes = {}
 
     def set_chunk_size(self, chunk_size):
         self._chunk_size = chunk_size
+        self._file_shapes = {}
 
     def set_dfs_file_meta(self, dkey):
         self._check_value_type(dkey, DKey)
         self._dkey0 = dkey
+        self._file_shapes = {}
 
     def set_dfs_inode(self, akey):
         self._check_value_type(akey, AKey)
         self._dfs_inode_akey = akey
+        self._symlink_akeys = {}
 
     def get_container(self):
         container = Container(objects=self._objects)
 
         return container
 
+    def create_partial(self):
+        partial_dfs = DFS(self._oclass)
+        partial_dfs._io_size = self._io_size
+        partial_dfs._chunk_size = self._chunk_size
+        partial_dfs._dkey0 = self._dkey0
+        partial_dfs._dfs_inode_akey = self._dfs_inode_akey
+        partial_dfs.set_verbose(self._verbose)
+
+        return partial_dfs
+
+    def merge(self, partial_dfs):
+        merged = set()
+
+        for shape, dir_object in partial_dfs._dir_shapes.items():
+            merged.add(id(dir_object))
+            twin = self._dir_shapes.get(shape)
+            if twin is None:
+                self._dir_shapes[shape] = dir_object
+                self._objects.append(dir_object)
+            else:
+                twin.set_count(twin.get_count() + dir_object.get_count())
+
+        for file_size, shape in partial_dfs._file_shapes.items():
+            file_object = shape[0]
+            merged.add(id(file_object))
+            twin = self._file_shapes.get(file_size)
+            if twin is None:
+                self._file_shapes[file_size] = shape
+                self._objects.append(file_object)
+            else:
+                twin[0].set_count(twin[0].get_count() + file_object.get_count())
+
+        for vos_object in partial_dfs._objects:
+            if id(vos_object) not in merged:
+                self._objects.append(vos_object)
+
+        self._all_ec_stats.add(partial_dfs._all_ec_stats)
+
     def copy(self):
         new_dfs = DFS(self._oclass)
         new_dfs._io_size = copy.deepcopy(self._io_size)
@@ -208,6 +419,9 @@ class DFS(CommonBase):
 
     def reset(self):
         self._objects = []
+        self._entries = {}
+        self._file_shapes = {}
+        self._dir_shapes = {}
 
     def add_obj(self):
         oid = len(self._objects)
@@ -216,34 +430,45 @@ class DFS(CommonBase):
         return oid
 
     def remove_obj(self, oid):
+        self._entries.pop(oid, None)
         self._objects.pop(oid)
 
     def add_symlink(self, oid, name, link_size, dkey_count=1):
-        akey = copy.deepcopy(self._dfs_inode_akey)
-        value = VosValue(size=link_size)
-        akey.add_value(value)
+        akey = self._symlink_akeys.get(link_size)
+        if akey is None:
+            akey = copy.deepcopy(self._dfs_inode_akey)
+            value = VosValue(size=link_size)
+            akey.add_value(value)
+            self._symlink_akeys[link_size] = akey
 
-        dkey = DKey(key=name)
-        dkey.set_count(dkey_count)
-        dkey.add_value(akey)
+        self._add_entry(oid, name, akey, link_size, dkey_count)
 
-        self._objects[oid].add_value(dkey)
+    def _add_entry(self, oid, name, akey, link_size=-1, dkey_count=1):
+        entries = self._entries.get(oid)
+        shape = (len(name.encode('utf-8')), link_size)
+
+        if entries is not None and shape in entries:
+            dkey = entries[shape]
+            dkey.set_count(dkey.get_count() + dkey_count)
+            return
 
-    def _add_entry(self, oid, name, dkey_count=1):
         dkey = DKey(key=name)
         dkey.set_count(dkey_count)
-        dkey.add_value(self._dfs_inode_akey)
+        dkey.add_value(akey)
 
         self._objects[oid].add_value(dkey)
 
+        if entries is not None:
+            entries[shape] = dkey
+
     def add_dummy(self, oid, name, dkey_count=1):
-        self._add_entry(oid, name, dkey_count)
+        self._add_entry(oid, name, self._dfs_inode_akey, dkey_count=dkey_count)
 
     def add_dir(self, oid, name, dkey_count=1):
-        self._add_entry(oid, name, dkey_count)
+        self._add_entry(oid, name, self._dfs_inode_akey, dkey_count=dkey_count)
 
     def add_file(self, oid, name, file_size, dkey_count=1):
-        self._add_entry(oid, name, dkey_count)
+        self._add_entry(oid, name, self._dfs_inode_akey, dkey_count=dkey_count)
         self.create_file_obj(file_size, dkey_count)
 
     def update_object_count(self, oid, count):
@@ -377,14 +602,45 @@ class DFS(CommonBase):
         parity_stats.show()
         self._all_ec_stats.add(parity_stats)
 
+        # entries of the last created directory are merged by shape
+        self._entries = {oid: {}}
+
         return oid
 
+    def close_dir_obj(self, oid):
+        entries = self._entries.pop(oid, None)
+        if entries is None:
+            return
+
+        dir_object = self._objects[oid]
+        shape = tuple(sorted(
+            (key, dkey.get_count()) for key, dkey in entries.items()))
+        twin = self._dir_shapes.get(shape)
+
+        if twin is None:
+            self._dir_shapes[shape] = dir_object
+            return
+
+        self._debug('merging directory with an identical one')
+        twin.set_count(twin.get_count() + dir_object.get_count())
+        self._objects.pop(oid)
+
     def create_file_obj(self, file_size, identical_files=1):
         parity_stats = CellStats(self._verbose)
 
         self._debug(
             'adding {0} file(s) of size of {1}'.format(
                 identical_files, file_size))
+
+        if file_size in self._file_shapes:
+            file_object, file_stats = self._file_shapes[file_size]
+            file_object.set_count(file_object.get_count() + identical_files)
+            parity_stats.add(file_stats)
+            parity_stats.mul(identical_files)
+            parity_stats.show()
+            self._all_ec_stats.add(parity_stats)
+            return
+
         file_object = VosObject()
         file_object.set_num_of_targets(self._oclass.get_file_targets())
         file_object.set_count(identical_files)
@@ -393,6 +649,10 @@ class DFS(CommonBase):
         self._add_chunk_size_elements(file_object, file_size, parity_stats)
         self._add_chunk_size_remainder(file_object, file_size, parity_stats)
 
+        file_stats = CellStats()
+        file_stats.add(parity_stats)
+        self._file_shapes[file_size] = (file_object, file_stats)
+
         parity_stats.mul(identical_files)
         parity_stats.show()
         self._all_ec_stats.add(parity_stats)
@@ -410,11 +670,89 @@ class DFS(CommonBase):
         file_object.add_value(dkey)
 
 
+class DirectoryQueue():
+    def __init__(self):
+        self._paths = deque()
+        self._pending = 0
+        self._cond = threading.Condition()
+
+    def put(self, path):
+        with self._cond:
+            self._paths.append(path)
+            self._pending += 1
+            self._cond.notify()
+
+    def get(self):
+        # returns None once every queued directory has been processed
+        with self._cond:
+            while not self._paths:
+                if self._pending == 0:
+                    return None
+                self._cond.wait()
+            return self._paths.popleft()
+
+    def task_done(self):
+        with self._cond:
+            self._pending -= 1
+            if self._pending == 0:
+                self._cond.notify_all()
+
+
+class ScanSnapshot():
+    """Per directory record of a file system scan
+
+    Every directory is stored with its mtime, the names of its
+    sub-directories and its other entries aggregated by kind, name size and
+    size. A directory whose mtime did not change since the snapshot was taken
+    can be replayed without reading it again. Rewriting a file in place does
+    not change the mtime of its directory, so the replayed size of such a file
+    is the one recorded in the snapshot.
+    """
+    VERSION = 1
+
+    def __init__(self):
+        self._dirs = {}
+
+    def __len__(self):
+        return len(self._dirs)
+
+    def load(self, file_name):
+        try:
+            with open(file_name, 'r') as snapshot_file:
+                data = json.load(snapshot_file)
+        except (OSError, ValueError):
+            return False
+
+        if data.get('version') != self.VERSION:
+            return False
+
+        self._dirs = data.get('directories', {})
+        return True
+
+    def save(self, file_name):
+        data = {'version': self.VERSION, 'directories': self._dirs}
+        tmp_name = '{0}.{1}'.format(file_name, os.getpid())
+        with open(tmp_name, 'w') as snapshot_file:
+            json.dump(data, snapshot_file, separators=(',', ':'))
+        os.replace(tmp_name, file_name)
+
+    def get(self, path, mtime):
+        record = self._dirs.get(path)
+        if record is None or record['mtime'] != mtime:
+            return None
+
+        return record
+
+    def add(self, path, record):
+        self._dirs[path] = record
+
+
 class FileSystemExplorer(CommonBase):
     def __init__(self, path, oclass):
         super().__init__()
         self._path = path
-        self._queue = []
+        self._queue = DirectoryQueue()
+        self._num_workers = 1
         self._count_files = 0
         self._count_dir = 0
         self._count_sym = 0
@@ -422,6 +760,12 @@ class FileSystemExplorer(CommonBase):
         self._file_size = 0
         self._sym_size = 0
         self._name_size = 0
+        self._count_reused = 0
+
+        self._snapshot_file = None
+        self._old_snapshot = None
+        self._snapshot = None
+        self._record = None
 
         self._oid = 0
         self._dfs = DFS(oclass)
@@ -439,10 +783,44 @@ class FileSystemExplorer(CommonBase):
     def set_dfs_file_meta(self, dkey):
         self.dfs.set_dfs_file_meta(dkey)
 
+    def set_num_workers(self, num_workers):
+        self._check_positive_number(num_workers)
+        self._num_workers = num_workers
+
+    def set_snapshot(self, file_name):
+        self._snapshot_file = file_name
+
     def explore(self):
         self._debug('processing path: {0}'.format(self._path))
         self._dfs.set_verbose(self._verbose)
+        self._load_snapshot()
         self._traverse_directories()
+        self._save_snapshot()
+
+    def _load_snapshot(self):
+        self._old_snapshot = None
+        self._snapshot = None
+        if not self._snapshot_file:
+            return
+
+        self._snapshot = ScanSnapshot()
+        old_snapshot = ScanSnapshot()
+        if old_snapshot.load(self._snapshot_file):
+            self._debug(
+                'loaded snapshot of {0} directories from {1}'.format(
+                    len(old_snapshot), self._snapshot_file))
+            self._old_snapshot = old_snapshot
+
+    def _save_snapshot(self):
+        if self._snapshot is None:
+            return
+
+        self._info(
+            '  {0} unchanged directories reused from the snapshot'.format(
+                self._count_reused))
+        self._snapshot.save(self._snapshot_file)
+        self._old_snapshot = None
+        self._snapshot = None
 
     def print_stats(self):
         pretty_size = self._to_human(self._file_size)
@@ -572,20 +950,25 @@ class FileSystemExplorer(CommonBase):
             count = 0
 
             for entry in it:
-                self._name_size += len(entry.name.encode("utf-8"))
+                name_size = len(entry.name.encode("utf-8"))
+                self._name_size += name_size
                 if entry.is_symlink():
                     self._process_symlink(entry)
+                    self._record_entry('l', name_size, entry)
                     count += 1
                 elif entry.is_dir():
                     self._process_dir(entry)
+                    self._record_dir(entry.name)
                     count += 1
                 elif entry.is_file():
                     self._process_file(entry)
+                    self._record_entry('f', name_size, entry)
                     count += 1
                 else:
                     self._error(
                         'found unknown object (skipped): {0}'.format(
                             entry.name))
+                    self._record_entry('u', name_size)
             if count == 0:
                 self._process_empty_dir()
 
@@ -599,18 +982,23 @@ class FileSystemExplorer(CommonBase):
             target = os.path.join(file_path, item)
 
             entry = Entry(item, target)
-            self._name_size += len(entry.name.encode("utf-8"))
+            name_size = len(entry.name.encode("utf-8"))
+            self._name_size += name_size
 
             if os.path.islink(target):
                 self._process_symlink(entry)
+                self._record_entry('l', name_size, entry)
             elif os.path.isdir(target):
                 self._process_dir(entry)
+                self._record_dir(entry.name)
             elif os.path.isfile(target):
                 self._process_file(entry)
+                self._record_entry('f', name_size, entry)
             else:
                 print(
                     'Error: found unknown object (skipped): {0}'.format(
                         entry.name))
+                self._record_entry('u', name_size)
 
     def _read_directory(self, file_path):
         try:
@@ -622,12 +1010,103 @@ class FileSystemExplorer(CommonBase):
         except OSError:
             self._error('permission denied (skipped): {0}'.format(file_path))
             self._process_error(file_path)
+            self._record_error()
         except Exception as err:
             self._error('opening dir {0}'.format(err))
             self._process_error(file_path)
+            self._record_error()
+
+    def _scan_directory(self, file_path):
+        if self._snapshot is None:
+            self._read_directory(file_path)
+            return
+
+        # the mtime is read first, a directory changed while it is being
+        # read is scanned again on the next run
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        self._record = {'dirs': [], 'items': {}, 'error': False}
+        self._read_directory(file_path)
+        record = self._record
+        self._record = None
+
+        if mtime is not None:
+            self._snapshot.add(file_path, {
+                'mtime': mtime,
+                'dirs': record['dirs'],
+                'items': [list(key) + [count]
+                          for key, count in record['items'].items()],
+                'error': record['error']})
+
+    def _replay_directory(self, file_path):
+        if self._old_snapshot is None:
+            return False
+
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            return False
+
+        record = self._old_snapshot.get(file_path, mtime)
+        if record is None:
+            return False
+
+        self._debug('reusing {0}'.format(file_path))
+        count = 0
+
+        for name in record['dirs']:
+            self._name_size += len(name.encode("utf-8"))
+            self._process_dir(Entry(name, os.path.join(file_path, name)))
+            count += 1
+
+        for kind, name_size, size, num in record['items']:
+            entry = SnapshotEntry('x' * name_size, file_path, size)
+            self._name_size += name_size * num
+            if kind == 'u':
+                continue
+            for _ in range(num):
+                if kind == 'l':
+                    self._process_symlink(entry)
+                else:
+                    self._process_file(entry)
+            count += num
+
+        if record['error']:
+            self._process_error(file_path)
+        elif count == 0:
+            self._process_empty_dir()
+
+        self._snapshot.add(file_path, record)
+        self._count_reused += 1
+
+        return True
+
+    def _record_entry(self, kind, name_size, entry=None):
+        if self._record is None:
+            return
+
+        size = 0
+        if entry is not None:
+            size = entry.stat(follow_symlinks=False).st_size
+
+        key = (kind, name_size, size)
+        items = self._record['items']
+        items[key] = items.get(key, 0) + 1
+
+    def _record_dir(self, name):
+        if self._record is not None:
+            self._record['dirs'].append(name)
+
+    def _record_error(self):
+        if self._record is not None:
+            self._record['error'] = True
 
     def _process_empty_dir(self):
         self._dfs.remove_obj(self._oid)
+        self._oid = None
 
     def _process_error(self, file_path):
         self._debug(
@@ -658,18 +1137,73 @@ class FileSystemExplorer(CommonBase):
 
     def _enqueue_path(self, path):
         path = os.path.realpath(path)
-        self._queue.append(path)
+        self._queue.put(path)
 
     def _traverse_directories(self):
         self._reset_stats()
         self._dfs.reset()
+        self._queue = DirectoryQueue()
         self._enqueue_path(self._path)
 
-        while(self._queue):
-            file_path = self._queue.pop(0)
-            self._oid = self._dfs.create_dir_obj()
-            self._debug('entering {0}'.format(file_path))
-            self._read_directory(file_path)
+        if self._num_workers == 1:
+            self._walk()
+            return
+
+        self._debug('using {0} workers'.format(self._num_workers))
+        workers = [self._create_worker() for _ in range(self._num_workers)]
+        threads = [threading.Thread(target=worker._walk)
+                   for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for worker in workers:
+            self._merge_worker(worker)
+
+    def _walk(self):
+        while True:
+            file_path = self._queue.get()
+            if file_path is None:
+                return
+
+            try:
+                self._open_dir_obj()
+                if not self._replay_directory(file_path):
+                    self._debug('entering {0}'.format(file_path))
+                    self._scan_directory(file_path)
+
+                if self._oid is not None:
+                    self._close_dir_obj()
+            finally:
+                self._queue.task_done()
+
+    def _open_dir_obj(self):
+        self._oid = self._dfs.create_dir_obj()
+
+    def _close_dir_obj(self):
+        self._dfs.close_dir_obj(self._oid)
+
+    def _create_worker(self):
+        worker = type(self)(self._path, None)
+        worker.set_verbose(self._verbose)
+        worker._queue = self._queue
+        worker._dfs = self._dfs.create_partial()
+        worker._old_snapshot = self._old_snapshot
+        worker._snapshot = self._snapshot
+
+        return worker
+
+    def _merge_worker(self, worker):
+        self._count_files += worker._count_files
+        self._count_dir += worker._count_dir
+        self._count_sym += worker._count_sym
+        self._count_error += worker._count_error
+        self._file_size += worker._file_size
+        self._sym_size += worker._sym_size
+        self._name_size += worker._name_size
+        self._count_reused += worker._count_reused
+        self._dfs.merge(worker._dfs)
 
     def _reset_stats(self):
         self._oid = 0
@@ -680,3 +1214,68 @@ class FileSystemExplorer(CommonBase):
         self._file_size = 0
         self._sym_size = 0
         self._name_size = 0
+        self._count_reused = 0
+
+
+class HistogramExplorer(FileSystemExplorer):
+    def __init__(self, path, oclass):
+        super().__init__(path, oclass)
+        self._histogram = FileHistogram()
+
+    def set_verbose(self, verbose):
+        super().set_verbose(verbose)
+        self._histogram.set_verbose(verbose)
+
+    def get_histogram(self):
+        return self._histogram
+
+    def get_dfs(self):
+        self._dfs = self._dfs.create_partial()
+        self._histogram.fill_dfs(self._dfs)
+
+        return super().get_dfs()
+
+    def _traverse_directories(self):
+        self._histogram = FileHistogram()
+        self._histogram.set_verbose(self._verbose)
+        super()._traverse_directories()
+
+    def _open_dir_obj(self):
+        self._oid = 0
+
+    def _close_dir_obj(self):
+        self._histogram.add_dir_obj()
+
+    def _merge_worker(self, worker):
+        super()._merge_worker(worker)
+        self._histogram.merge(worker._histogram)
+
+    def _process_empty_dir(self):
+        self._oid = None
+
+    def _process_error(self, file_path):
+        self._debug('a adding dummy entry for {0}'.format(file_path))
+        self._histogram.add_entry(len('unknown'))
+        self._count_error += 1
+
+    def _process_symlink(self, entry):
+        self._debug('symlink:   {0}'.format(entry.name))
+        info = entry.stat(follow_symlinks=False)
+        self._histogram.add_symlink(
+            info.st_size, len(entry.name.encode("utf-8")))
+        self._sym_size += info.st_size
+        self._count_sym += 1
+
+    def _process_dir(self, entry):
+        self._debug('directory: {0}'.format(entry.name))
+        self._histogram.add_entry(len(entry.name.encode("utf-8")))
+        self._enqueue_path(entry.path)
+        self._count_dir += 1
+
+    def _process_file(self, entry):
+        self._debug('file:      {0}'.format(entry.name))
+        info = entry.stat(follow_symlinks=False)
+        self._histogram.add_file(
+            info.st_size, len(entry.name.encode("utf-8")))
+        self._file_size += info.st_size
+        self._count_files += 1
@@ -5,12 +5,100 @@
   SPDX-License-Identifier: BSD-2-Clause-Patent
 '''
 
-from storage_estimator.explorer import AverageFS
+import csv
+import itertools
+import time
+
+from storage_estimator.explorer import AverageFS, HistogramFS
 from storage_estimator.dfs_sb import get_dfs_inode_akey
-from storage_estimator.util import ProcessBase
+from storage_estimator.util import CommonBase, ProcessBase, FILE_SIZES
+
+# rows parsed between two progress reports of a per-file inventory
+INVENTORY_CHUNK = 100000
+
+FILE_TYPES = ('f', 'file', 'regular')
+DIR_TYPES = ('d', 'dir', 'directory')
+SYMLINK_TYPES = ('l', 'link', 'symlink')
+
+
+class InventoryCSV(CommonBase):
+    """Stream a per-file inventory into a HistogramFS
+
+    The inventory has one row per item and a header naming its columns.
+    The "size" column is required. The "type" column (f, d or l as printed
+    by find -printf %y) defaults to regular files. The file name size is
+    taken from the "name" or the "path" column, or from the default name
+    size when none of them is present.
+    """
+
+    def __init__(self, name_size=32):
+        super().__init__()
+        self._name_size = name_size
+        self._count_rows = 0
+        self._count_skipped = 0
+
+    def _get_columns(self, header):
+        fields = [field.strip().lower() for field in header]
+        if 'size' not in fields:
+            raise Exception(
+                'per-file CSV must provide a "size" column, got {0}'.format(
+                    fields))
+
+        size_idx = fields.index('size')
+        type_idx = fields.index('type') if 'type' in fields else None
+        name_idx = None
+        for name in ('name', 'path'):
+            if name in fields:
+                name_idx = fields.index(name)
+                break
+
+        return size_idx, type_idx, name_idx
+
+    def read(self, file_name, hfs):
+        start = time.monotonic()
+
+        with open(file_name, 'r', newline='') as csv_file:
+            reader = csv.reader(csv_file)
+            size_idx, type_idx, name_idx = self._get_columns(next(reader))
+
+            while True:
+                rows = list(itertools.islice(reader, INVENTORY_CHUNK))
+                if not rows:
+                    break
+                self._process_rows(rows, hfs, size_idx, type_idx, name_idx)
+                self._debug('{0} rows processed'.format(self._count_rows))
+
+        elapsed = max(time.monotonic() - start, 1e-9)
+        self._info('  processed {0} rows in {1:.2f} s ({2:.0f} rows/s)'.format(
+            self._count_rows, elapsed, self._count_rows / elapsed))
+        if self._count_skipped:
+            self._info('  skipped {0} unsupported or malformed rows'.format(
+                self._count_skipped))
+
+    def _process_rows(self, rows, hfs, size_idx, type_idx, name_idx):
+        name_size = self._name_size
+
+        for row in rows:
+            try:
+                size = int(row[size_idx])
+                item_type = 'f' if type_idx is None else row[type_idx].strip().lower()
+                if name_idx is not None:
+                    name = row[name_idx].rstrip('/').rsplit('/', 1)[-1]
+                    name_size = len(name.encode('utf-8'))
+            except (IndexError, ValueError):
+                self._count_skipped += 1
+                continue
+
+            if item_type in FILE_TYPES:
+                hfs.add_file(size, name_size)
+            elif item_type in DIR_TYPES:
+                hfs.add_dir(name_size)
+            elif item_type in SYMLINK_TYPES:
+                hfs.add_symlink(size, name_size)
+            else:
+                self._count_skipped += 1
 
-FILE_SIZES = ['4k', '64k', '128k', '256k', '512k', '768k', '1m', '8m', '64m',
-              '128m', '1g', '10g', '100g', '250g', '500g', '1t', '10t', '100t']
+        self._count_rows += len(rows)
 
 
 class ProcessCSV(ProcessBase):
@@ -18,13 +106,30 @@ class ProcessCSV(ProcessBase):
         super().__init__(args)
 
     def run(self):
-        fse = self._ingest_csv()
+        if self._args.per_file:
+            fse = self._ingest_inventory()
+        else:
+            fse = self._ingest_csv()
         config_yaml = self._get_yaml_from_dfs(fse)
 
-        yaml_str = self._dump_yaml(config_yaml)
-        self._create_file(self._args.output, yaml_str)
+        self._save_config(self._args.output, config_yaml)
         self._process_yaml(config_yaml)
 
+    def _ingest_inventory(self):
+        """Parse a per-file inventory into file size and name histograms"""
+
+        hfs = HistogramFS(self._oclass)
+        hfs.set_verbose(self._verbose)
+        hfs.set_dfs_inode(get_dfs_inode_akey())
+        hfs.set_io_size(self._io_size)
+        hfs.set_chunk_size(self._chunk_size)
+
+        inventory = InventoryCSV(self._args.file_name_size)
+        inventory.set_verbose(self._verbose)
+        inventory.read(self._args.csv[0], hfs)
+
+        return hfs
+
     def _ingest_csv(self):
         """Parse csv and produce yaml input to vos_size.py"""
 
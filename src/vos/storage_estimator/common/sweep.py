@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+'''
+  (C) Copyright 2022 Intel Corporation.
+
+  SPDX-License-Identifier: BSD-2-Clause-Patent
+'''
+
+import copy
+import csv
+import itertools
+import multiprocessing
+
+from storage_estimator.dfs_sb import get_dfs_inode_akey
+from storage_estimator.explorer import HistogramExplorer, HistogramFS
+from storage_estimator.parse_csv import InventoryCSV
+from storage_estimator.util import Common, ProcessBase
+from storage_estimator.vos_size import ClosedFormOverhead, convert
+
+SWEEP_PARAMETERS = ['dir_oclass', 'file_oclass', 'chunk_size', 'io_size',
+                    'checksum', 'num_shards']
+SWEEP_RESULTS = ['scm_total', 'nvme_total', 'total', 'error']
+
+# state shared by the sweep workers, set once per process
+_sweep_state = {}
+
+
+def _init_worker(meta, histogram, inode_akey):
+    _sweep_state['meta'] = meta
+    _sweep_state['histogram'] = histogram
+    _sweep_state['inode_akey'] = inode_akey
+
+
+def _evaluate_point(args):
+    result = dict((name, vars(args)[name]) for name in SWEEP_PARAMETERS)
+    try:
+        point = SweepPoint(args, _sweep_state['meta'])
+        result.update(point.evaluate(
+            _sweep_state['histogram'], _sweep_state['inode_akey']))
+    except Exception as err:
+        result['error'] = str(err)
+
+    return result
+
+
+class SweepPoint(ProcessBase):
+    """One configuration of a sweep, evaluated from a shared histogram"""
+
+    def __init__(self, args, meta):
+        self._sweep_meta = meta
+        super().__init__(args)
+
+    def _get_vos_meta(self):
+        return copy.deepcopy(self._sweep_meta)
+
+    def evaluate(self, histogram, inode_akey):
+        hfs = HistogramFS(self._oclass)
+        hfs.set_histogram(histogram)
+        hfs.set_dfs_inode(inode_akey)
+        hfs.set_io_size(self._io_size)
+        hfs.set_chunk_size(self._chunk_size)
+        config = self._get_yaml_from_dfs(hfs)
+
+        overheads = ClosedFormOverhead(
+            self._args, config['num_shards'], self._meta,
+            vars(self._args).get('seed'))
+        for container in config['containers']:
+            overheads.load_container(container)
+        stats = overheads.get_stats()
+
+        return {'scm_total': stats.get('total') - stats.get('nvme_total'),
+                'nvme_total': stats.get('nvme_total'),
+                'total': stats.get('total'),
+                'error': ''}
+
+
+class ProcessSweep(Common):
+    def __init__(self, args):
+        super().__init__(args)
+        if args.meta:
+            self._meta = self._load_yaml_from_file(args.meta)
+
+    def run(self):
+        histogram = self._ingest()
+        points = self._get_points()
+        self._info('Evaluating {0} configurations'.format(len(points)))
+
+        initargs = (self._meta, histogram, get_dfs_inode_akey())
+        if self._args.jobs == 1 or len(points) == 1:
+            _init_worker(*initargs)
+            results = [_evaluate_point(point) for point in points]
+        else:
+            with multiprocessing.Pool(self._args.jobs, _init_worker,
+                                      initargs) as pool:
+                results = pool.map(_evaluate_point, points)
+
+        self._print_table(results)
+        self._save_csv(self._args.output, results)
+
+    def _ingest(self):
+        path = self._args.path[0]
+
+        if self._args.per_file:
+            hfs = HistogramFS(None)
+            inventory = InventoryCSV(self._args.file_name_size)
+            inventory.set_verbose(self._verbose)
+            inventory.read(path, hfs)
+            return hfs.get_histogram()
+
+        fse = HistogramExplorer(path, None)
+        fse.set_verbose(self._verbose)
+        fse.set_num_workers(self._args.workers)
+        fse.explore()
+        fse.print_stats()
+
+        return fse.get_histogram()
+
+    def _get_values(self, name):
+        values = [value.strip() for value in vars(self._args)[name].split(',')]
+        if name == 'checksum':
+            return ['' if value == 'none' else value for value in values]
+        if name == 'num_shards':
+            return [int(value) for value in values]
+
+        return values
+
+    def _get_points(self):
+        grid = [self._get_values(name) for name in SWEEP_PARAMETERS]
+        points = []
+
+        for values in itertools.product(*grid):
+            point = copy.copy(self._args)
+            point.verbose = False
+            point.meta = ''
+            for name, value in zip(SWEEP_PARAMETERS, values):
+                setattr(point, name, value)
+            points.append(point)
+
+        return points
+
+    def _print_table(self, results):
+        line = '{0:<10} {1:<10} {2:<8} {3:<8} {4:<8} {5:>6} {6:>14} {7:>14} {8:>14}'
+        self._info(line.format('dir', 'file', 'chunk', 'io', 'checksum',
+                               'shards', 'scm_total', 'nvme_total', 'total'))
+
+        for result in results:
+            values = [result[name] for name in SWEEP_PARAMETERS]
+            values[4] = values[4] or 'none'
+            if result['error']:
+                self._info(line.format(*values, 'error:', result['error'], ''))
+                continue
+            self._info(line.format(*values,
+                                   convert(result['scm_total']),
+                                   convert(result['nvme_total']),
+                                   convert(result['total'])))
+
+    def _save_csv(self, file_name, results):
+        if not file_name:
+            return
+
+        try:
+            self._print_destination_file(file_name)
+            with open(file_name, 'w', newline='') as csv_file:
+                writer = csv.DictWriter(
+                    csv_file, fieldnames=SWEEP_PARAMETERS + SWEEP_RESULTS)
+                writer.writeheader()
+                writer.writerows(results)
+        except OSError as err:
+            raise Exception(
+                'Failed to open file {0} {1}'.format(
+                    file_name, err))
@@ -73,10 +73,12 @@ print_header "Storage Estimator: read_csv"
 
 CLIENT_CSV="${CURRENT_DIR}/test_files/test_data.csv"
 CLIENT_YAML="${TEST_DIR}/test_data.yaml"
+CLIENT_INVENTORY="${CURRENT_DIR}/test_files/test_inventory.csv"
 
 daos_storage_estimator.py read_csv -h
 daos_storage_estimator.py read_csv -v "${CLIENT_CSV}" -o "${CLIENT_YAML}"
 daos_storage_estimator.py read_yaml -v "${CLIENT_YAML}"
+daos_storage_estimator.py read_csv -v --per-file "${CLIENT_INVENTORY}"
 daos_storage_estimator.py read_csv -v "${CLIENT_CSV}" --file_oclass SX
 daos_storage_estimator.py read_csv -v "${CLIENT_CSV}" --file_oclass RP_3GX
 daos_storage_estimator.py read_csv -v "${CLIENT_CSV}" --file_oclass EC_16P2GX
@@ -103,6 +105,12 @@ daos_storage_estimator.py explore_fs -v "${TEST_DIR}"
 daos_storage_estimator.py explore_fs -v -m "${VOS_SIZE}" "${TEST_DIR}"
 daos_storage_estimator.py explore_fs -v "${TEST_DIR}" -o "${FS_YAML}"
 daos_storage_estimator.py read_yaml "${FS_YAML}"
+daos_storage_estimator.py explore_fs -v "${TEST_DIR}" -o "${TEST_DIR}/test_fs_data.json"
+daos_storage_estimator.py read_yaml "${TEST_DIR}/test_fs_data.json"
+daos_storage_estimator.py explore_fs -v -w 4 "${TEST_DIR}"
+daos_storage_estimator.py explore_fs -v -H "${TEST_DIR}"
+daos_storage_estimator.py explore_fs -v -p "${TEST_DIR}/fs_snapshot.json" "${TEST_DIR}"
+daos_storage_estimator.py explore_fs -v -p "${TEST_DIR}/fs_snapshot.json" "${TEST_DIR}"
 daos_storage_estimator.py explore_fs -v -x "${TEST_DIR}"
 daos_storage_estimator.py explore_fs -v -x -m "${VOS_SIZE}" "${TEST_DIR}"
 daos_storage_estimator.py explore_fs -v -x "${TEST_DIR}" -o "${FS_YAML}"
@@ -117,4 +125,11 @@ daos_storage_estimator.py explore_fs -v "${TEST_DIR}" --file_oclass RP_3GX \
 daos_storage_estimator.py explore_fs -v "${TEST_DIR}" --file_oclass EC_16P2GX \
 --checksum crc32
 
+print_header "Storage Estimator: sweep"
+
+daos_storage_estimator.py sweep -h
+daos_storage_estimator.py sweep -r SX,RP_3GX,EC_16P2GX -k none,crc32 "${TEST_DIR}"
+daos_storage_estimator.py sweep --per-file -c 1MiB,4MiB -n 100,1000 \
+-o "${TEST_DIR}/sweep.csv" "${CLIENT_INVENTORY}"
+
 print_header "Storage Estimator: Successful"
@@ -5,13 +5,22 @@
 '''
 import pytest
 import unittest
+import random
 import yaml
 import os
+import json
+import tempfile
+import subprocess  # nosec
+import sys
+from unittest import mock
 
 from storage_estimator.vos_structures import VosObject, AKey, DKey, Container, Containers, VosValue, Overhead, ValType, VosValueError
-from storage_estimator.explorer import FileSystemExplorer
+from storage_estimator.explorer import FileSystemExplorer, HistogramExplorer, HistogramFS, DFS
 from storage_estimator.util import ObjectClass
-from storage_estimator.parse_csv import ProcessCSV
+from storage_estimator.parse_csv import ProcessCSV, InventoryCSV
+from storage_estimator.vos_size import MetaOverhead, ClosedFormOverhead
+from storage_estimator.sweep import ProcessSweep, _init_worker, _evaluate_point
+from storage_estimator import dfs_sb
 from .util import FileGenerator
 
 
@@ -23,6 +32,8 @@ class MockArgs():
         self.csv = [csv_file]
         self.alloc_overhead = 16
         self.file_name_size = 32
+        self.per_file = False
+        self.seed = None
         self.num_shards = 1000
         self.meta = ""
         self.scm_cutoff = ""
@@ -696,13 +707,14 @@ class FSTestCase(unittest.TestCase):
 
         return akey
 
-    def _create_dfs_for_explorer(self, args, reference_file):
+    def _create_dfs_for_explorer(self, args, reference_file, num_workers=1):
         oclass = ObjectClass(args)
         fse = FileSystemExplorer(self.root_dir, oclass)
         akey = self._create_inode_akey("DFS_INODE", 64)
         fse.set_dfs_inode(akey)
         fse.set_io_size(131072)
         fse.set_chunk_size(1048576)
+        fse.set_num_workers(num_workers)
         fse.explore()
         dfs = fse.get_dfs()
         container = dfs.get_container()
@@ -727,6 +739,123 @@ class FSTestCase(unittest.TestCase):
         args = MockArgs("SX")
         self._create_dfs_for_explorer(args, "test_data_sx.yaml")
 
+    @pytest.mark.sx
+    def test_create_dfs_sx_parallel(self):
+        args = MockArgs("SX")
+        self._create_dfs_for_explorer(args, "test_data_sx.yaml", 4)
+
+    @pytest.mark.sx
+    def test_create_dfs_sx_histogram(self):
+        oclass = ObjectClass(MockArgs("SX"))
+        fse = HistogramExplorer(self.root_dir, oclass)
+        fse.set_dfs_inode(self._create_inode_akey("DFS_INODE", 64))
+        fse.set_io_size(131072)
+        fse.set_chunk_size(1048576)
+        fse.explore()
+        container = fse.get_dfs().get_container()
+        container.add_value(self.test_data.get_mock_dfs_superblock_obj())
+        got = self.test_data.process_stats(container.dump())
+
+        test_file = os.path.join(self.test_files, "test_data_sx.yaml")
+        reference = yaml.safe_load(open(test_file, "r"))
+        gold_container = {}
+        for container in reference.get("containers"):
+            gold_container.update(container)
+        want = self.test_data.process_stats(gold_container)
+
+        # the four files share a size bucket, only their average is kept and
+        # the directory entries are rounded up to the average directory
+        assert got["objects"] == want["objects"] # nosec
+        assert got["dkeys"] >= want["dkeys"] # nosec
+        assert abs(got["value_size"] - want["value_size"]) < 1000 # nosec
+
+    def _explore_stats(self, snapshot_file=None):
+        oclass = ObjectClass(MockArgs("SX"))
+        fse = FileSystemExplorer(self.root_dir, oclass)
+        fse.set_dfs_inode(self._create_inode_akey("DFS_INODE", 64))
+        if snapshot_file:
+            fse.set_snapshot(snapshot_file)
+        fse.explore()
+        container = fse.get_dfs().get_container()
+
+        return fse, self.test_data.process_stats(container.dump())
+
+    @pytest.mark.sx
+    def test_create_dfs_sx_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_file = os.path.join(tmp_dir, "snapshot.json")
+            _, want = self._explore_stats()
+
+            fse, got = self._explore_stats(snapshot_file)
+            assert fse._count_reused == 0 # nosec
+            assert got == want # nosec
+
+            fse, got = self._explore_stats(snapshot_file)
+            assert fse._count_reused == 4 # nosec
+            assert got == want # nosec
+
+            self.fg.generate_file("specs/new_file.txt", 4096)
+            _, want = self._explore_stats()
+            fse, got = self._explore_stats(snapshot_file)
+            assert fse._count_reused == 3 # nosec
+            assert got == want # nosec
+
+    @pytest.mark.sx
+    def test_create_dfs_sx_inventory(self):
+        oclass = ObjectClass(MockArgs("SX"))
+        akey = self._create_inode_akey("DFS_INODE", 64)
+
+        fse = HistogramExplorer(self.root_dir, oclass)
+        fse.set_dfs_inode(akey)
+        fse.explore()
+        want = self.test_data.process_stats(
+            fse.get_dfs().get_container().dump())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            inventory_file = os.path.join(tmp_dir, "inventory.csv")
+            with open(inventory_file, "w") as inventory:
+                inventory.write("path,type,size\n")
+                inventory.write("{0},d,4096\n".format(self.root_dir))
+                for root, dirs, files in os.walk(self.root_dir):
+                    for name in dirs:
+                        inventory.write("{0},d,4096\n".format(
+                            os.path.join(root, name)))
+                    for name in files:
+                        path = os.path.join(root, name)
+                        if os.path.islink(path):
+                            item_type = "l"
+                        else:
+                            item_type = "f"
+                        inventory.write("{0},{1},{2}\n".format(
+                            path, item_type, os.lstat(path).st_size))
+                inventory.write("bad,row\n")
+
+            hfs = HistogramFS(oclass)
+            hfs.set_dfs_inode(akey)
+            InventoryCSV().read(inventory_file, hfs)
+            got = self.test_data.process_stats(
+                hfs.get_dfs().get_container().dump())
+
+        # the inventory also lists the entry of the root directory
+        assert got["objects"] == want["objects"] # nosec
+        assert got["dkeys"] >= want["dkeys"] # nosec
+        assert abs(got["value_size"] - want["value_size"]) < 1000 # nosec
+
+    @pytest.mark.ut
+    def test_inventory_types(self):
+        oclass = ObjectClass(MockArgs("SX"))
+        hfs = HistogramFS(oclass)
+        hfs.set_dfs_inode(self._create_inode_akey("DFS_INODE", 64))
+
+        # the example inventory has upper case and padded types
+        inventory_file = os.path.join(
+            os.path.dirname(__file__), "test_files", "test_inventory.csv")
+        inventory = InventoryCSV()
+        inventory.read(inventory_file, hfs)
+
+        assert inventory._count_rows == 12 # nosec
+        assert inventory._count_skipped == 0 # nosec
+
     @pytest.mark.rp3gx
     def test_create_dfs_3gx(self):
         args = MockArgs("RP_3GX")
@@ -738,6 +867,278 @@ class FSTestCase(unittest.TestCase):
         self._create_dfs_for_explorer(args, "test_data_16p2gx.yaml")
 
 
+@pytest.mark.usefixtures("vos_test_data")
+class DFSTestCase(unittest.TestCase):
+    def _create_dir(self, dfs, num_files):
+        oid = dfs.create_dir_obj()
+        for idx in range(num_files):
+            dfs.add_file(oid, "file_{0:04d}".format(idx), 1048576)
+            dfs.add_symlink(oid, "link_{0:04d}".format(idx), 32)
+        dfs.close_dir_obj(oid)
+
+    @pytest.mark.ut
+    def test_identical_items(self):
+        dfs = DFS(ObjectClass(MockArgs("SX")))
+
+        for _ in range(10):
+            self._create_dir(dfs, 100)
+
+        container = dfs.get_container().dump()
+        # one directory and one file object with multiplicities
+        assert len(container["objects"]) == 2 # nosec
+
+        got = self.test_data.process_stats(container)
+        assert got["objects"] == 10 + 10 * 100 # nosec
+        assert got["dkeys"] == 10 * 100 * 2 + 10 * 100 * 2 # nosec
+
+MOCK_DFS_LAYOUT = {'dkey': 'DFS_SB_METADATA',
+                   'dkey_size': 15,
+                   'akeys': [{'key': 'DFS_MAGIC',
+                              'key_size': 9,
+                              'value_type': 'single_value',
+                              'count': 1,
+                              'size': 8}],
+                   'entry_key_size': 255,
+                   'entry_size': 88}
+
+
+class MockCache():
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._env = os.environ.get(dfs_sb.CACHE_ENV)
+        os.environ[dfs_sb.CACHE_ENV] = self._tmp_dir.name
+        dfs_sb._dfs_layout = None
+
+    def tearDown(self):
+        if self._env is None:
+            del os.environ[dfs_sb.CACHE_ENV]
+        else:
+            os.environ[dfs_sb.CACHE_ENV] = self._env
+        dfs_sb._dfs_layout = None
+        self._tmp_dir.cleanup()
+
+
+class CacheTestCase(MockCache, unittest.TestCase):
+    @pytest.mark.ut
+    def test_cached_structures(self):
+        cache = dfs_sb.STRUCTURES_CACHE()
+        cache.store('dfs_sb', MOCK_DFS_LAYOUT)
+        cache.store('vos_size', 'root: 280', '16')
+
+        assert dfs_sb.get_vos_size_str(16, '/mnt/daos') == 'root: 280' # nosec
+
+        obj = dfs_sb.get_dfs_sb_obj().dump()
+        sb_dkey, root_dkey = obj['dkeys']
+        assert sb_dkey['akeys'][0]['values'][0]['size'] == 8 # nosec
+        assert root_dkey['akeys'][0]['size'] == 255 # nosec
+        assert root_dkey['akeys'][0]['values'][0]['size'] == 88 # nosec
+        assert 'dfs_magic: &dfs_magic' in dfs_sb.get_dfs_sb() # nosec
+
+    @pytest.mark.ut
+    def test_stale_cache(self):
+        cache = dfs_sb.STRUCTURES_CACHE()
+        cache.store('vos_size', 'root: 280', '16')
+        assert cache.load('vos_size', '0') is None # nosec
+
+        file_name = cache._get_file_name('vos_size')
+        with open(file_name, 'r') as cache_file:
+            data = json.load(cache_file)
+        data['cache_version'] = dfs_sb.CACHE_VERSION + 1
+        with open(file_name, 'w') as cache_file:
+            json.dump(data, cache_file)
+
+        assert cache.load('vos_size', '16') is None # nosec
+
+    @pytest.mark.ut
+    def test_cache_without_pydaos(self):
+        cache = dfs_sb.STRUCTURES_CACHE()
+        cache.store('dfs_sb', MOCK_DFS_LAYOUT)
+        cache.store('vos_size', 'root: 280', '16')
+
+        # pydaos needs the DAOS libraries, so block it in a new interpreter.
+        script = '''
+import sys
+sys.modules['pydaos'] = None
+from storage_estimator import dfs_sb, explorer, parse_csv, sweep, util
+assert dfs_sb.get_vos_size_str(16, '/mnt/daos') == 'root: 280'
+assert 'dfs_magic: &dfs_magic' in dfs_sb.get_dfs_sb()
+'''
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        subprocess.run([sys.executable, '-c', script], env=env, check=True)  # nosec
+
+    @pytest.mark.ut
+    def test_unknown_version_cache(self):
+        lib_dir = os.path.join(self._tmp_dir.name, 'lib')
+        os.makedirs(os.path.join(lib_dir, 'daos_srv'))
+        for lib_name in dfs_sb.CACHED_LIBS:
+            with open(os.path.join(lib_dir, lib_name), 'w') as lib_file:
+                lib_file.write('build 1')
+
+        with mock.patch.object(dfs_sb, '_get_lib_path', return_value=lib_dir):
+            cache = dfs_sb.STRUCTURES_CACHE()
+            cache.store('vos_size', 'root: 280', '16')
+            assert cache.load('vos_size', '16') == 'root: 280' # nosec
+
+            with open(os.path.join(lib_dir, 'libdfs.so'), 'w') as lib_file:
+                lib_file.write('build 2')
+            cache = dfs_sb.STRUCTURES_CACHE()
+            assert cache.load('vos_size', '16') is None # nosec
+
+            os.makedirs(os.path.join(lib_dir, 'daos'))
+            with open(os.path.join(lib_dir, 'daos', 'VERSION'), 'w') as version_file:
+                version_file.write('2.2.0')
+            cache = dfs_sb.STRUCTURES_CACHE()
+            assert cache._get_file_name('vos_size').endswith('vos_size_2.2.0.json') # nosec
+
+
+class SweepTestCase(MockCache, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        current_dir = os.path.dirname(__file__)
+        meta_file = os.path.join(current_dir, "test_files", "vos_size.yaml")
+        with open(meta_file, "r") as meta:
+            self.meta_str = meta.read()
+
+        cache = dfs_sb.STRUCTURES_CACHE()
+        cache.store('dfs_sb', MOCK_DFS_LAYOUT)
+        cache.store('vos_size', self.meta_str, '16')
+
+        self.fg = FileGenerator()
+        self.fg.crete_mock_fs([{"type": "file",
+                                "path": "data/driver.bin",
+                                "size": 5767168},
+                               {"type": "file",
+                                "path": "specs/readme.txt",
+                                "size": 1572864}])
+
+    @pytest.mark.ut
+    def test_sweep_points(self):
+        args = MockArgs()
+        args.path = [self.fg.get_root()]
+        args.vospath = ""
+        args.workers = 1
+        args.jobs = 1
+        args.output = ""
+        args.dir_oclass = "S1,S8"
+        args.file_oclass = "SX,RP_3GX"
+        args.chunk_size = "1MiB"
+        args.io_size = "128KiB"
+        args.checksum = "none,crc32"
+        args.num_shards = "4"
+        # same object placement for every configuration
+        args.seed = 1234
+
+        sweep = ProcessSweep(args)
+        histogram = sweep._ingest()
+        points = sweep._get_points()
+        assert len(points) == 8 # nosec
+
+        _init_worker(yaml.safe_load(self.meta_str), histogram,
+                     dfs_sb.get_dfs_inode_akey())
+        results = {(result["dir_oclass"], result["file_oclass"],
+                    result["checksum"]): result
+                   for result in map(_evaluate_point, points)}
+
+        # S8 directories do not fit in 4 shards
+        assert results[("S8", "SX", "")]["error"] # nosec
+
+        sx = results[("S1", "SX", "")]
+        rp = results[("S1", "RP_3GX", "")]
+        csum = results[("S1", "SX", "crc32")]
+        assert not sx["error"] # nosec
+        assert rp["nvme_total"] == 3 * sx["nvme_total"] # nosec
+        assert csum["scm_total"] > sx["scm_total"] # nosec
+        assert csum["nvme_total"] == sx["nvme_total"] # nosec
+
+
+class OverheadTestCase(unittest.TestCase):
+    def setUp(self):
+        current_dir = os.path.dirname(__file__)
+        self.test_files = os.path.join(current_dir, "test_files")
+        meta_file = os.path.join(self.test_files, "vos_size.yaml")
+        self.meta = yaml.safe_load(open(meta_file, "r"))
+
+    def _get_overheads(self, overhead_class, config, num_shards, seed=1234):
+        overheads = overhead_class(MockArgs(), num_shards, self.meta, seed)
+        for container in config.get("containers"):
+            overheads.load_container(container)
+
+        return overheads
+
+    def _get_stats(self, overhead_class, config, num_shards, seed=1234):
+        overheads = self._get_overheads(
+            overhead_class, config, num_shards, seed)
+
+        return overheads.get_stats().stats
+
+    def _compare_overheads(self, reference_file):
+        test_file = os.path.join(self.test_files, reference_file)
+        config = yaml.safe_load(open(test_file, "r"))
+
+        for num_shards in [1, 7, 1000]:
+            want = self._get_stats(MetaOverhead, config, num_shards)
+            got = self._get_stats(ClosedFormOverhead, config, num_shards)
+            assert want == got # nosec
+
+    @pytest.mark.ut
+    def test_closed_form_overhead(self):
+        self._compare_overheads("test_data_sx.yaml")
+        self._compare_overheads("test_data_3gx.yaml")
+        self._compare_overheads("test_data_16p2gx.yaml")
+        self._compare_overheads("test_data_big_sx.yaml")
+        self._compare_overheads("test_data_big_16p2gx.yaml")
+
+    @pytest.mark.ut
+    def test_closed_form_overhead_targets(self):
+        value = {"count": 3, "size": 5000}
+        akey = {"count": 2, "size": 4, "value_type": "array",
+                "values": [value]}
+        dkey = {"count": 17, "size": 10, "akeys": [akey]}
+        config = {"containers": [{
+            "count": 3, "csum_size": 8, "csum_gran": 4096,
+            "objects": [{"count": 5, "targets": 9, "dkeys": [dkey]}]}]}
+
+        # more targets than pools and dkeys not multiple of the targets
+        for num_shards in [1, 7, 16]:
+            want = self._get_stats(MetaOverhead, config, num_shards)
+            got = self._get_stats(ClosedFormOverhead, config, num_shards)
+            assert want == got # nosec
+
+    @pytest.mark.ut
+    def test_seeded_overhead(self):
+        test_file = os.path.join(self.test_files, "test_data_big_sx.yaml")
+        config = yaml.safe_load(open(test_file, "r"))
+
+        for overhead_class in [MetaOverhead, ClosedFormOverhead]:
+            want = self._get_stats(overhead_class, config, 7, seed=42)
+            random.seed(1)
+            got = self._get_stats(overhead_class, config, 7, seed=42)
+            assert want == got # nosec
+
+    @pytest.mark.ut
+    def test_symmetric_overhead(self):
+        value = {"count": 1, "size": 5000}
+        akey = {"count": 2, "size": 4, "value_type": "array",
+                "values": [value]}
+        dkey = {"count": 21, "size": 10, "akeys": [akey]}
+        config = {"containers": [{
+            "count": 2, "csum_size": 8, "csum_gran": 4096,
+            "objects": [{"count": 5, "targets": 0, "dkeys": [dkey]}]}]}
+
+        # every pool gets 3 dkeys
+        want = self._get_stats(MetaOverhead, config, 7)
+        got = self._get_stats(ClosedFormOverhead, config, 7)
+        assert want == got # nosec
+
+        # an object on a few targets breaks the symmetry
+        config["containers"][0]["objects"].append(
+            {"count": 1, "targets": 2, "dkeys": [dkey]})
+        want = self._get_stats(MetaOverhead, config, 7)
+        got = self._get_stats(ClosedFormOverhead, config, 7)
+        assert want == got # nosec
+
+
 @pytest.mark.usefixtures("vos_test_data")
 class CSVTestCase(unittest.TestCase):
     def setUp(self):
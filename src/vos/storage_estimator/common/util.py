@@ -7,12 +7,20 @@
 
 
 import os
+import json
 import yaml
 
-from storage_estimator.dfs_sb import VOS_SIZE, get_dfs_sb_obj
-from storage_estimator.vos_size import MetaOverhead
+from storage_estimator.dfs_sb import get_vos_size_str, get_dfs_sb_obj
+from storage_estimator.vos_size import ClosedFormOverhead
 from storage_estimator.vos_structures import Containers
 
+# the LibYAML bindings are much faster for big configurations
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+FILE_SIZES = ['4k', '64k', '128k', '256k', '512k', '768k', '1m', '8m', '64m',
+              '128m', '1g', '10g', '100g', '250g', '500g', '1t', '10t', '100t']
+
 
 class CommonBase():
     def __init__(self):
@@ -298,25 +306,45 @@ class Common(CommonBase):
     def _get_vos_meta(self):
         self._meta_str = self._create_vos_meta()
 
-        return yaml.safe_load(self._meta_str)
+        return yaml.load(self._meta_str, Loader=YAML_LOADER) # nosec
 
     def _create_vos_meta(self):
-        vos_size = VOS_SIZE()
-        meta_str = vos_size.get_vos_size_str(self._args.alloc_overhead, self._args.vospath)
-
-        return meta_str
+        return get_vos_size_str(self._args.alloc_overhead, self._args.vospath)
 
     def _print_destination_file(self, file_name):
         file_name = os.path.normpath(file_name)
         self._debug('Output file: {0}'.format(file_name))
 
     def _dump_yaml(self, yaml_str):
-        return yaml.safe_dump(yaml_str, default_flow_style=False)
+        return yaml.dump(yaml_str, Dumper=YAML_DUMPER, default_flow_style=False)
+
+    def _save_config(self, file_name, config):
+        # the configuration is only serialized when it is saved, the
+        # estimation works on the in-memory structure
+        if not file_name:
+            return
+
+        if not file_name.endswith('.json'):
+            self._create_file(file_name, self._dump_yaml(config))
+            return
+
+        try:
+            self._print_destination_file(file_name)
+            with open(file_name, 'w') as f:
+                json.dump(config, f, separators=(',', ':'))
+        except OSError as err:
+            raise Exception(
+                'Failed to open file {0} {1}'.format(
+                    file_name, err))
 
     def _load_yaml_from_file(self, file_name):
         self._debug('loading yaml file {0}'.format(file_name))
         try:
-            data = yaml.safe_load(open(file_name, 'r'))
+            with open(file_name, 'r') as f:
+                if file_name.endswith('.json'):
+                    data = json.load(f)
+                else:
+                    data = yaml.load(f, Loader=YAML_LOADER) # nosec
         except OSError as err:
             raise Exception(
                 'Failed to open file {0} {1}'.format(
@@ -328,7 +356,9 @@ class Common(CommonBase):
         num_shards = config_yaml.get('num_shards', 1)
         self._debug('using {0} vos pools'.format(num_shards))
 
-        overheads = MetaOverhead(self._args, num_shards, self._meta)
+        seed = vars(self._args).get('seed')
+        overheads = ClosedFormOverhead(
+            self._args, num_shards, self._meta, seed)
 
         if 'containers' not in config_yaml:
             raise Exception(
@@ -120,11 +120,13 @@ class Stats():
 class MetaOverhead():
     """Class for calculating overheads"""
 
-    def __init__(self, args, num_pools, meta_yaml):
+    def __init__(self, args, num_pools, meta_yaml, seed=None):
         """class for keeping track of overheads"""
         self.args = args
         self.meta = meta_yaml
         self.num_pools = num_pools
+        # a given seed makes the placement of the objects reproducible
+        self.rng = random.Random(seed)
         self.pools = []
         for _index in range(0, self.num_pools):
             self.pools.append({"trees": [], "dup": 1, "key": "container",
@@ -172,7 +174,7 @@ class MetaOverhead():
 
     def init_dkeys(self, oid, obj_spec, num_of_targets):
         """Handle akey specification"""
-        start_pool = random.randint(0, self.num_pools - 1) #nosec
+        start_pool = self.rng.randint(0, self.num_pools - 1) #nosec
         pool_idx = start_pool
 
         for dkey_spec in obj_spec.get("dkeys"):
@@ -287,20 +289,23 @@ class MetaOverhead():
                 return item["size"], item["size"], 1
         raise "Bug parsing dynamic tree order information!!!"
 
-    def calc_tree(self, stats, tree):
-        """calculate the totals"""
-        tree_stats = Stats()
-        key = tree["key"]
-        num_values = tree["count"]
+    def get_node_overhead(self, key, num_values):
+        """Calculate the overhead of a tree holding num_values records"""
         record_size = self.meta["trees"][key]["record_msize"]
         leaf_size, int_size, tree_nodes = self.get_dynamic(key, num_values)
         rec_overhead = num_values * record_size
         if leaf_size != int_size and tree_nodes != 1:
             leafs = tree_nodes // 2
             ints = tree_nodes - leafs
-            overhead = leafs * leaf_size + ints * int_size + rec_overhead
-        else:
-            overhead = tree_nodes * leaf_size + rec_overhead
+            return leafs * leaf_size + ints * int_size + rec_overhead
+        return tree_nodes * leaf_size + rec_overhead
+
+    def calc_tree(self, stats, tree):
+        """calculate the totals"""
+        tree_stats = Stats()
+        key = tree["key"]
+        num_values = tree["count"]
+        overhead = self.get_node_overhead(key, num_values)
         if key in ("akey", "single_value", "array"):
             # key refers to child tree
             if tree["overhead"] == "user":
@@ -318,8 +323,8 @@ class MetaOverhead():
         tree_stats.mult(tree["dup"])
         stats.merge(tree_stats)
 
-    def print_report(self):
-        """Calculate and pretty print a report"""
+    def get_stats(self):
+        """Calculate the statistics of all the pools"""
         stats = Stats()
 
         for pool in range(0, self.num_pools):
@@ -327,4 +332,159 @@ class MetaOverhead():
             stats.add_meta("container", int(self.meta.get("container")))
             self.calc_tree(stats, self.pools[pool])
 
-        stats.pretty_print()
+        return stats
+
+    def print_report(self):
+        """Calculate and pretty print a report"""
+        self.get_stats().pretty_print()
+
+
+class ClosedFormOverhead(MetaOverhead):
+    """Class for calculating overheads without per pool trees
+
+    Objects are placed on the pools exactly as MetaOverhead does, but the
+    per pool trees are never built.  The subtree of an object only depends
+    on which dkeys land on a pool, so it is calculated once per distinct
+    spread and multiplied by the number of pools sharing it.  Only the number
+    of objects per pool and container is tracked, with a difference array.
+    """
+
+    def __init__(self, args, num_pools, meta_yaml, seed=None):
+        """class for keeping track of overheads"""
+        super().__init__(args, num_pools, meta_yaml, seed)
+        self.pools = []
+        self.containers = []
+
+    def init_container(self, cont_spec):
+        """Handle a container specification"""
+        if "objects" not in cont_spec:
+            raise RuntimeError("No objects in container spec %s" % cont_spec)
+
+        cont = {"dup": int(cont_spec.get("count", 1)),
+                "csum_size": int(cont_spec.get("csum_size", 0)),
+                "csum_gran": int(cont_spec.get("csum_gran", 1048576)),
+                "objects": [0] * (self.num_pools + 1),
+                "stats": Stats()}
+        self.containers.append(cont)
+
+        for obj_spec in cont_spec.get("objects"):
+            self.init_object(obj_spec)
+
+    def init_dkeys(self, oid, obj_spec, num_of_targets):
+        """Handle akey specification"""
+        start_pool = self.rng.randint(0, self.num_pools - 1) #nosec
+        cont = self.containers[-1]
+
+        spreads = []
+        for dkey_spec in obj_spec.get("dkeys"):
+            if "akeys" not in dkey_spec:
+                raise RuntimeError("No akeys in dkey spec %s" % dkey_spec)
+            check_key_type(dkey_spec)
+            dkey_count = int(dkey_spec.get("count", 1))
+            full_count = dkey_count // num_of_targets
+            partial_count = dkey_count % num_of_targets
+            num_pools = num_of_targets
+            if full_count == 0:
+                num_pools = partial_count
+            spreads.append((dkey_spec, full_count, partial_count, num_pools))
+
+        # the object is created on the pools of the first num_pools indexes
+        num_pools = max([spread[3] for spread in spreads], default=0)
+        if num_pools == 0:
+            return
+
+        if num_pools <= self.num_pools:
+            self._add_object_range(cont, obj_spec, spreads, start_pool,
+                                   num_pools)
+            return
+
+        # more targets than pools, some pools hold several indexes
+        for first in range(0, self.num_pools):
+            indexes = range(first, num_pools, self.num_pools)
+            self._add_object_stats(cont, obj_spec, spreads, indexes, 1)
+            self._add_object_count(cont, obj_spec, (start_pool + first) %
+                                   self.num_pools, 1)
+
+    def _add_object_range(self, cont, obj_spec, spreads, start_pool,
+                          num_pools):
+        """Add an object placed on num_pools pools from start_pool"""
+        bounds = set([0, num_pools])
+        for _dkey_spec, _full_count, partial_count, dkey_pools in spreads:
+            bounds.add(min(partial_count, num_pools))
+            bounds.add(dkey_pools)
+        bounds = sorted(bounds)
+
+        # every index between two bounds gets the same dkeys
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            self._add_object_stats(cont, obj_spec, spreads, [low], high - low)
+
+        self._add_object_count(cont, obj_spec, start_pool, num_pools)
+
+    def _add_object_count(self, cont, obj_spec, start_pool, num_pools):
+        """Account an object on num_pools consecutive pools"""
+        count = int(obj_spec.get("count", 1))
+        objects = cont["objects"]
+        end_pool = start_pool + num_pools
+        objects[start_pool] += count
+        if end_pool <= self.num_pools:
+            objects[end_pool] -= count
+        else:
+            objects[self.num_pools] -= count
+            objects[0] += count
+            objects[end_pool - self.num_pools] -= count
+
+    def _add_object_stats(self, cont, obj_spec, spreads, indexes, mult):
+        """Calculate the subtree of an object holding the dkeys of indexes"""
+        obj = {"dup": int(obj_spec.get("count", 1)), "key": "dkey",
+               "count": 0, "trees": []}
+        for dkey_spec, full_count, partial_count, dkey_pools in spreads:
+            for idx in indexes:
+                if idx >= dkey_pools:
+                    continue
+                dup = full_count
+                if partial_count > idx:
+                    dup += 1
+                dkey = {"dup": dup, "key": "akey", "count": 0, "trees": [],
+                        "type": dkey_spec.get("type", "hashed"),
+                        "size": int(dkey_spec.get("size", 0)),
+                        "overhead": dkey_spec.get("overhead", "user")}
+                obj["trees"].append(dkey)
+                obj["count"] += dup
+                for akey_spec in dkey_spec.get("akeys"):
+                    self.init_akey(cont, dkey, akey_spec)
+
+        stats = Stats()
+        self.csum_size = cont["csum_size"]
+        self.calc_tree(stats, obj)
+        stats.mult(mult)
+        cont["stats"].merge(stats)
+
+    def get_stats(self):
+        """Calculate the statistics of all the pools"""
+        stats = Stats()
+        pool_stats = Stats()
+        pool_stats.add_meta("pool", int(self.meta.get("root")))
+        pool_stats.add_meta("container", int(self.meta.get("container")))
+        num_conts = sum([cont["dup"] for cont in self.containers])
+        pool_stats.add_meta("container",
+                            self.get_node_overhead("container", num_conts))
+        pool_stats.mult(self.num_pools)
+        stats.merge(pool_stats)
+
+        for cont in self.containers:
+            overheads = {}
+            overhead = 0
+            num_objects = 0
+            for pool in range(0, self.num_pools):
+                num_objects += cont["objects"][pool]
+                if num_objects not in overheads:
+                    overheads[num_objects] = self.get_node_overhead(
+                        "object", num_objects)
+                overhead += overheads[num_objects]
+            cont_stats = Stats()
+            cont_stats.add_meta("object", overhead)
+            cont_stats.merge(cont["stats"])
+            cont_stats.mult(cont["dup"])
+            stats.merge(cont_stats)
+
+        return stats
@@ -26,6 +26,8 @@ class StrBool(Enum):
 
 
 class VosBase():
+    __slots__ = ('_payload',)
+
     def __init__(self, count):
         self._payload = dict()
         self.set_count(count)
@@ -33,6 +35,9 @@ class VosBase():
     def dump(self):
         return self._payload
 
+    def get_count(self):
+        return self._payload.get("count", 1)
+
     def set_count(self, count):
         if count is None:
             return
@@ -49,6 +54,8 @@ class VosBase():
 
 
 class VosValue(VosBase):
+    __slots__ = ()
+
     def __init__(self, size=None, count=1, aligned=None):
         super().__init__(count)
         self._set_size(size)
@@ -74,6 +81,8 @@ class VosValue(VosBase):
 
 
 class VosItems(VosBase):
+    __slots__ = ('_values_label', '_values_type')
+
     def __init__(
             self,
             count=None,
@@ -111,6 +120,8 @@ class VosItems(VosBase):
 
 
 class VosKey(VosItems):
+    __slots__ = ()
+
     def __init__(
             self,
             key=None,
@@ -156,6 +167,8 @@ class VosKey(VosItems):
 
 
 class AKey(VosKey):
+    __slots__ = ()
+
     def __init__(
             self,
             key=None,
@@ -187,6 +200,8 @@ class AKey(VosKey):
 
 
 class DKey(VosKey):
+    __slots__ = ()
+
     def __init__(
             self,
             key=None,
@@ -205,6 +220,8 @@ class DKey(VosKey):
 
 
 class VosObject(VosItems):
+    __slots__ = ()
+
     def __init__(self, count=1, dkeys=[], targets=0):
         super().__init__(count, dkeys, "dkeys", DKey)
         self.set_num_of_targets(targets)
@@ -216,6 +233,8 @@ class VosObject(VosItems):
 
 
 class Container(VosItems):
+    __slots__ = ()
+
     def __init__(self, count=1, csum_size=0, csum_gran=16384, objects=[]):
         super().__init__(count, objects, "objects", VosObject)
         self.set_csum_size(csum_size)
@@ -233,6 +252,8 @@ class Container(VosItems):
 
 
 class Containers(VosItems):
+    __slots__ = ('_num_shards',)
+
     def __init__(self, num_shards=1000, containers=[]):
         super().__init__(
             count=None,
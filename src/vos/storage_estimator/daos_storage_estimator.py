@@ -5,11 +5,13 @@
   SPDX-License-Identifier: BSD-2-Clause-Patent
 '''
 import argparse
+import os
 import sys
 
 from storage_estimator.dfs_sb import get_dfs_example, print_daos_version, get_dfs_inode_akey
 from storage_estimator.parse_csv import ProcessCSV
-from storage_estimator.explorer import FileSystemExplorer
+from storage_estimator.sweep import ProcessSweep
+from storage_estimator.explorer import FileSystemExplorer, HistogramExplorer
 from storage_estimator.util import Common, ProcessBase
 
 tool_description = '''DAOS estimation tool
@@ -47,17 +49,22 @@ class ProcessFS(ProcessBase):
     def run(self):
         fse = self._get_estimate_from_fs()
         config_yaml = self._get_yaml_from_dfs(fse, args.average)
-        yaml_str = self._dump_yaml(config_yaml)
-        self._create_file(args.output, yaml_str)
+        self._save_config(args.output, config_yaml)
         self._process_yaml(config_yaml)
 
     def _get_estimate_from_fs(self):
         inode_akey = get_dfs_inode_akey()
-        fse = FileSystemExplorer(args.path[0], self._oclass)
+        if args.histogram:
+            fse = HistogramExplorer(args.path[0], self._oclass)
+        else:
+            fse = FileSystemExplorer(args.path[0], self._oclass)
         fse.set_verbose(args.verbose)
         fse.set_io_size(self.get_io_size())
         fse.set_chunk_size(self.get_chunk_size())
         fse.set_dfs_inode(inode_akey)
+        fse.set_num_workers(args.workers)
+        if args.snapshot:
+            fse.set_snapshot(args.snapshot)
         fse.explore()
         fse.print_stats()
 
@@ -105,6 +112,16 @@ def process_csv(args):
         sys.exit(-1)
 
 
+def process_sweep(args):
+    try:
+        print_daos_version()
+        sweep = ProcessSweep(args)
+        sweep.run()
+    except Exception as err:
+        print('Error: {0}'.format(err))
+        sys.exit(-1)
+
+
 # create the top-level parser
 parser = argparse.ArgumentParser(description=tool_description)
 subparsers = parser.add_subparsers(description='valid subcommands')
@@ -180,6 +197,24 @@ explore.add_argument(
     '--average',
     action='store_true',
     help='Use average file size for estimation. (Faster)')
+explore.add_argument(
+    '-H',
+    '--histogram',
+    action='store_true',
+    help='Use file size and name size histograms for estimation. (Fast, more accurate than average)')
+explore.add_argument(
+    '-w',
+    '--workers',
+    type=int,
+    help='Number of threads used to walk the directory tree',
+    default=1)
+explore.add_argument(
+    '-p',
+    '--snapshot',
+    type=str,
+    help='[optional] Scan snapshot file. Directories whose mtime is unchanged since the previous run are '
+         'not read again, so files rewritten in place keep the size recorded in the snapshot',
+    default='')
 explore.add_argument(
     '-i',
     '--io_size',
@@ -223,7 +258,7 @@ explore.add_argument(
     '--output',
     dest='output',
     type=str,
-    help='Output file name',
+    help='Output file name, a .json extension selects the compact JSON format',
     default='')
 explore.add_argument(
     '-S',
@@ -233,6 +268,11 @@ explore.add_argument(
     help='DAOS storage path',
     default=vos_path_default)
 
+explore.add_argument(
+    '--seed',
+    type=int,
+    help='[optional] Seed of the placement of the objects on the VOS pools, for reproducible results',
+    default=None)
 explore.set_defaults(func=process_fs)
 
 # parse a yaml file
@@ -244,7 +284,7 @@ yaml_file.add_argument(
     action='store_true',
     help='Explain what is being done')
 yaml_file.add_argument('config', metavar='CONFIG', type=str, nargs=1,
-                       help='Path to the input yaml configuration file')
+                       help='Path to the input yaml or json configuration file')
 yaml_file.add_argument('-a', '--alloc_overhead', type=int,
                        help='Vos alloc overhead', default=16)
 yaml_file.add_argument(
@@ -266,6 +306,11 @@ yaml_file.add_argument(
     type=str,
     help='DAOS storage path',
     default=vos_path_default)
+yaml_file.add_argument(
+    '--seed',
+    type=int,
+    help='[optional] Seed of the placement of the objects on the VOS pools, for reproducible results',
+    default=None)
 yaml_file.set_defaults(func=process_yaml)
 
 # parse a csv file
@@ -277,6 +322,11 @@ csv_file.add_argument(
     type=str,
     nargs=1,
     help='Input CSV file (assumes Argonne format)')
+csv_file.add_argument(
+    '--per-file',
+    dest='per_file',
+    action='store_true',
+    help='The CSV file is a per-file inventory with "size", "type" and "path" columns')
 csv_file.add_argument(
     '--file_name_size',
     type=int,
@@ -342,7 +392,7 @@ csv_file.add_argument(
     '-o', '--output',
     dest='output',
     type=str,
-    help='Output file name',
+    help='Output file name, a .json extension selects the compact JSON format',
     default='')
 csv_file.add_argument(
     '-S',
@@ -351,8 +401,121 @@ csv_file.add_argument(
     type=str,
     help='DAOS storage path',
     default=vos_path_default)
+csv_file.add_argument(
+    '--seed',
+    type=int,
+    help='[optional] Seed of the placement of the objects on the VOS pools, for reproducible results',
+    default=None)
 csv_file.set_defaults(func=process_csv)
 
+# evaluate several configurations at once
+sweep = subparsers.add_parser(
+    'sweep',
+    help='Estimate the VOS overhead of a tree directory or a per-file CSV for several configurations')
+sweep.add_argument(
+    'path',
+    type=str,
+    nargs=1,
+    help='Path to the target directory, or to the CSV file with --per-file')
+sweep.add_argument(
+    '--per-file',
+    dest='per_file',
+    action='store_true',
+    help='The path is a per-file inventory CSV file')
+sweep.add_argument(
+    '--file_name_size',
+    type=int,
+    dest='file_name_size',
+    help='Average file name length, when the inventory has no name',
+    default=32)
+sweep.add_argument(
+    '-v',
+    '--verbose',
+    action='store_true',
+    help='Explain what is being done')
+sweep.add_argument(
+    '-t',
+    '--dir_oclass',
+    type=str,
+    help='Comma separated list of object classes for directories',
+    default='S1')
+sweep.add_argument(
+    '-r',
+    '--file_oclass',
+    type=str,
+    help='Comma separated list of object classes for files',
+    default='SX')
+sweep.add_argument(
+    '-i',
+    '--io_size',
+    type=str,
+    help='Comma separated list of I/O sizes',
+    default='128KiB')
+sweep.add_argument(
+    '-c',
+    '--chunk_size',
+    type=str,
+    help='Comma separated list of array chunk sizes. Must be multiple of I/O size',
+    default='1MiB')
+sweep.add_argument(
+    '-k',
+    '--checksum',
+    type=str,
+    help='Comma separated list of checksum algorithms, "none" for no checksum',
+    default='none')
+sweep.add_argument(
+    '-n',
+    '--num_shards',
+    type=str,
+    help='Comma separated list of number of VOS Pools',
+    default='1000')
+sweep.add_argument(
+    '-s',
+    '--scm_cutoff',
+    type=str,
+    help='SCM threshold in bytes, optional suffixes KiB, MiB, ..., YiB',
+    default='')
+sweep.add_argument('-a', '--alloc_overhead', type=int,
+                   help='Vos alloc overhead', default=16)
+sweep.add_argument(
+    '-w',
+    '--workers',
+    type=int,
+    help='Number of threads used to walk the directory tree',
+    default=1)
+sweep.add_argument(
+    '-j',
+    '--jobs',
+    type=int,
+    help='Number of processes evaluating the configurations',
+    default=os.cpu_count() or 1)
+sweep.add_argument(
+    '-m',
+    '--meta',
+    metavar='META',
+    help='[optional] Input metadata file',
+    default='')
+sweep.add_argument(
+    '-o',
+    '--output',
+    dest='output',
+    type=str,
+    help='[optional] Output CSV file with one row per configuration',
+    default='')
+sweep.add_argument(
+    '-S',
+    '--storage',
+    dest='vospath',
+    type=str,
+    help='DAOS storage path',
+    default=vos_path_default)
+sweep.add_argument(
+    '--seed',
+    type=int,
+    help='[optional] Seed of the placement of the objects on the VOS pools, for reproducible results',
+    default=None)
+sweep.set_defaults(func=process_sweep)
+
 # parse the args and call whatever function was selected
 args = parser.parse_args()
 args.func(args)
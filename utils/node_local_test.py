@@ -13,6 +13,7 @@ the client with fault injection of D_ALLOC() usage.
 
 import os
 from os.path import join
+import bz2
 import sys
 import time
 import uuid
@@ -20,6 +21,7 @@ import json
 import copy
 import signal
 import pprint
+import queue
 import stat
 import errno
 import argparse
@@ -27,7 +29,9 @@ import tabulate
 import threading
 import functools
 import traceback
+import shutil
 import subprocess #nosec
+import concurrent.futures
 import junit_xml
 import tempfile
 import pickle #nosec
@@ -92,10 +96,17 @@ class NLTConf():
                 os.rmdir(self.tmp_dir)
             os.makedirs(self.tmp_dir)
 
-        self._compress_procs = []
+        # Compress logs with a pool of threads, each of which runs pbzip2 if it is installed
+        # or uses the bz2 module otherwise, which releases the GIL while compressing.
+        self._compress_jobs = args.compress_jobs or os.cpu_count()
+        self._compress_pool = None
+        self._compress_futures = []
+        self._pbzip2 = shutil.which('pbzip2')
 
     def __del__(self):
         self.flush_bz2()
+        if self._compress_pool:
+            self._compress_pool.shutdown()
         os.rmdir(self.dfuse_parent_dir)
 
     def set_wf(self, wf):
@@ -123,21 +134,55 @@ class NLTConf():
     def compress_file(self, filename):
         """Compress a file using bz2 for space reasons
 
-        Launch a bzip2 process in the background as this is time consuming, and each time
-        a new process is launched then reap any previous ones which have completed.
+        This is time consuming so queue the file to be compressed in the background, at most
+        compress_jobs files are compressed at once.
         """
 
-        # pylint: disable=consider-using-with
-        self._compress_procs[:] = (proc for proc in self._compress_procs if proc.poll())
-        self._compress_procs.append(subprocess.Popen(['bzip2', '--best', filename]))
+        if self._compress_pool is None:
+            self._compress_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._compress_jobs, thread_name_prefix='nlt_bz2')
+        running = []
+        for future in self._compress_futures:
+            if future.done():
+                # Raise any exception from the compression.
+                future.result()
+            else:
+                running.append(future)
+        self._compress_futures = running
+        self._compress_futures.append(self._compress_pool.submit(self._compress, filename))
+
+    def _compress(self, filename):
+        """Compress a file to filename.bz2 and remove it, in a pool thread"""
+        start = time.time()
+        bz2_file = '{}.bz2'.format(filename)
+        try:
+            if self._pbzip2:
+                # Share the cpus between the pool threads.
+                threads = max(1, os.cpu_count() // self._compress_jobs)
+                subprocess.run([self._pbzip2, '-9', '-p{}'.format(threads), filename],
+                               check=True)
+            else:
+                with open(filename, 'rb') as in_fd:
+                    with bz2.open(bz2_file, 'wb', compresslevel=9) as out_fd:
+                        shutil.copyfileobj(in_fd, out_fd, 1024 * 1024)
+                os.unlink(filename)
+        except (OSError, subprocess.CalledProcessError) as error:
+            print('Failed to compress {}: {}'.format(filename, error))
+            # Keep the original file rather than a truncated copy of it.
+            if os.path.exists(filename) and os.path.exists(bz2_file):
+                os.unlink(bz2_file)
+            raise
+        self.lt_compress.add(time.time() - start)
 
     def flush_bz2(self):
-        """Wait for all bzip2 subprocess to finish"""
-        self.lt_compress.start()
-        for proc in self._compress_procs:
-            proc.wait()
-        self._compress_procs = []
-        self.lt_compress.stop()
+        """Wait for all queued files to be compressed
+
+        Any exception raised while compressing a file is raised here.
+        """
+        futures = self._compress_futures
+        self._compress_futures = []
+        for future in futures:
+            future.result()
 
 class CulmTimer():
     """Class to keep track of elapsed time so we know where to focus performance tuning"""
@@ -145,6 +190,7 @@ class CulmTimer():
     def __init__(self):
         self.total = 0
         self._start = None
+        self._lock = threading.Lock()
 
     def start(self):
         """Start the timer"""
@@ -152,7 +198,12 @@ class CulmTimer():
 
     def stop(self):
         """Stop the timer, and add elapsed to total"""
-        self.total += time.time() - self._start
+        self.add(time.time() - self._start)
+
+    def add(self, elapsed):
+        """Add time measured elsewhere, such as by another thread"""
+        with self._lock:
+            self.total += elapsed
 
 class BoolRatchet():
     """Used for saving test results"""
@@ -471,6 +522,7 @@ class DaosServer():
                                              dir=conf.tmp_dir,
                                              delete=False)
             self.server_logs.append(lf)
+        self._log_streams = {}
         self.__process_name = 'daos_engine'
         if self.valgrind:
             self.__process_name = 'valgrind'
@@ -527,7 +579,8 @@ class DaosServer():
             os.unlink(server_file)
         for log in self.server_logs:
             if os.path.exists(log.name):
-                log_test(self.conf, log.name)
+                log_test(self.conf, log.name,
+                         stream=self._log_streams.pop(log.name, None))
         try:
             os.rmdir(self.agent_dir)
         except OSError as error:
@@ -662,6 +715,9 @@ class DaosServer():
         if self.conf.args.no_root:
             cmd.append('--recreate-superblocks')
 
+        for log in self.server_logs:
+            self._log_streams[log.name] = LogTestStream(log.name)
+
         self._sp = subprocess.Popen(cmd)
 
         agent_config = join(self_dir, 'nlt_agent.yaml')
@@ -822,7 +878,8 @@ class DaosServer():
         self.conf.compress_file(self.control_log.name)
 
         for log in self.server_logs:
-            log_test(self.conf, log.name, leak_wf=wf)
+            log_test(self.conf, log.name, leak_wf=wf,
+                     stream=self._log_streams.pop(log.name, None))
             self.server_logs.remove(log)
         self.running = False
         return ret
@@ -1042,6 +1099,7 @@ class DFuse():
         self._sp = None
 
         self.log_file = None
+        self._log_stream = None
 
         self.valgrind = None
         if not os.path.exists(self.dir):
@@ -1116,6 +1174,7 @@ class DFuse():
         if self.container:
             cmd.extend(['--container', self.container])
         print('Running {}'.format(' '.join(cmd)))
+        self._log_stream = LogTestStream(self.log_file)
         self._sp = subprocess.Popen(cmd, env=my_env)
         print('Started dfuse at {}'.format(self.dir))
         print('Log file is {}'.format(self.log_file))
@@ -1128,7 +1187,7 @@ class DFuse():
                 print('dfuse command exited with {}'.format(ret))
                 self._sp = None
                 if os.path.exists(self.log_file):
-                    log_test(self.conf, self.log_file)
+                    log_test(self.conf, self.log_file, stream=self._pop_log_stream())
                 os.rmdir(self.dir)
                 raise Exception('dfuse died waiting for start')
             except subprocess.TimeoutExpired:
@@ -1139,6 +1198,12 @@ class DFuse():
 
         self._daos.add_fuse(self)
 
+    def _pop_log_stream(self):
+        """Return the log checker of the current instance"""
+        log_stream = self._log_stream
+        self._log_stream = None
+        return log_stream
+
     def _close_files(self):
         work_done = False
         for fname in os.listdir('/proc/self/fd'):
@@ -1186,8 +1251,11 @@ class DFuse():
             fatal_errors = True
             run_log_test = False
         self._sp = None
+        log_stream = self._pop_log_stream()
         if run_log_test:
-            log_test(self.conf, self.log_file)
+            log_test(self.conf, self.log_file, stream=log_stream)
+        else:
+            log_stream.abandon()
 
         # Finally, modify the valgrind xml file to remove the
         # prefix to the src dir.
@@ -1201,7 +1269,7 @@ class DFuse():
         ret = self._sp.wait()
         print('rc from dfuse {}'.format(ret))
         self._sp = None
-        log_test(self.conf, self.log_file)
+        log_test(self.conf, self.log_file, stream=self._pop_log_stream())
 
         # Finally, modify the valgrind xml file to remove the
         # prefix to the src dir.
@@ -3044,29 +3112,65 @@ def log_timer(func):
 
     return log_timer_wrapper
 
-@log_timer
-def log_test(conf,
-             filename,
-             show_memleaks=True,
-             quiet=False,
-             skip_fi=False,
-             leak_wf=None,
-             check_read=False,
-             check_write=False,
-             check_fstat=False):
-    """Run the log checker on filename, logging to stdout"""
+class LogTestStream():
+    """Run the log checker on a log file while it is being written
 
-    # Check if the log file has wrapped, if it has then log parsing checks do
-    # not work correctly.
-    if os.path.exists('{}.old'.format(filename)):
-        raise Exception('Log file exceeded max size')
-    fstat = os.stat(filename)
-    if fstat.st_size == 0:
-        os.unlink(filename)
-        return None
-    if not quiet:
-        print('Running log_test on {} {}'.format(filename,
-                                                 sizeof_fmt(fstat.st_size)))
+    A background thread follows the file and checks new lines as they are
+    written, so that when the process exits most of the checking is done.
+    Pass the stream to log_test() once the process has exited to finish the
+    checks and report the results.
+    """
+
+    def __init__(self, filename, interval=0.5):
+        self.filename = filename
+        self._interval = interval
+        self._follower = lp.LogFollower(filename)
+        self._lto = lt.LogTest(None)
+        self._done = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._follow, daemon=True)
+        self._thread.start()
+
+    def _follow(self):
+        """Check new lines until stopped"""
+        try:
+            while not self._done.wait(timeout=self._interval):
+                self._lto.check_log_lines(self._follower.read_lines(),
+                                          abort_on_warning=True)
+        except Exception as error: # pylint: disable=broad-except
+            self._error = error
+
+    def stop(self):
+        """Stop following the file, and check the remaining lines
+
+        Returns the LogTest object to finish the checks with, or None if the
+        log file could not be followed, in which case it should be checked
+        from the start.
+        """
+        self._done.set()
+        self._thread.join()
+        if self._error:
+            raise self._error
+        self._lto.check_log_lines(self._follower.read_lines(final=True),
+                                  abort_on_warning=True)
+        self._follower.close()
+        if self._follower.wrapped:
+            return None
+        return self._lto
+
+    def abandon(self):
+        """Stop following the file without checking it
+
+        Used when the log test is skipped, any error from the background
+        thread is dropped along with the remaining lines.
+        """
+        self._done.set()
+        self._thread.join()
+        self._follower.close()
+
+def _check_log_file(conf, filename, show_memleaks, quiet, skip_fi, leak_wf,
+                    check_read, check_write, check_fstat):
+    """Run the log checker on a complete log file"""
 
     log_iter = lp.LogIter(filename)
 
@@ -3104,6 +3208,55 @@ def log_test(conf,
     if check_fstat and 'dfuse___fxstat' not in functions:
         raise NLTestNoFunction('dfuse___fxstat')
 
+    return lto
+
+@log_timer
+def log_test(conf,
+             filename,
+             show_memleaks=True,
+             quiet=False,
+             skip_fi=False,
+             leak_wf=None,
+             check_read=False,
+             check_write=False,
+             check_fstat=False,
+             stream=None):
+    """Run the log checker on filename, logging to stdout
+
+    If stream is set then it is a LogTestStream which has been checking the
+    file while it was written, so only the checks of the last lines remain.
+    Streams do not support the skip_fi or check_ options.
+    """
+
+    lto = None
+    if stream:
+        if skip_fi or check_read or check_write or check_fstat:
+            stream.abandon()
+            raise Exception('skip_fi and check_ options are not supported with a stream')
+        lto = stream.stop()
+
+    # Check if the log file has wrapped, if it has then log parsing checks do
+    # not work correctly.
+    if os.path.exists('{}.old'.format(filename)):
+        raise Exception('Log file exceeded max size')
+    fstat = os.stat(filename)
+    if fstat.st_size == 0:
+        os.unlink(filename)
+        return None
+    if not quiet:
+        print('Running log_test on {} {}'.format(filename,
+                                                 sizeof_fmt(fstat.st_size)))
+
+    if lto:
+        conf.compress_file(filename)
+        try:
+            lto.finish_log_lines(show_memleaks=show_memleaks, leak_wf=leak_wf)
+        except lt.LogCheckError:
+            pass
+    else:
+        lto = _check_log_file(conf, filename, show_memleaks, quiet, skip_fi,
+                              leak_wf, check_read, check_write, check_fstat)
+
     if conf.max_log_size and fstat.st_size > conf.max_log_size:
         raise Exception('Max log size exceeded, {} > {}'.format(sizeof_fmt(fstat.st_size),
                                                                 sizeof_fmt(conf.max_log_size)))
@@ -3591,6 +3744,10 @@ def test_pydaos_kv(server, conf):
 # location is re-run at the end under valgrind to get better diagnostics.
 #
 
+# Output of fault injection commands is kept in memory up to this size, and in a temporary file
+# after that.
+FI_OUTPUT_BUFFER_SIZE = 1024 * 1024
+
 class AllocFailTestRun():
     """Class to run a fault injection command with a single fault"""
 
@@ -3615,6 +3772,10 @@ class AllocFailTestRun():
         self.fi_loc = None
         self.fault_injected = None
         self.loc = loc
+        # Threads reading stdout and stderr, and the files they are read into.
+        self._readers = []
+        self._stdout_file = None
+        self._stderr_file = None
 
         if loc is None:
             prefix = 'dnt_fi_{}_reference_'.format(aft.description)
@@ -3681,16 +3842,41 @@ class AllocFailTestRun():
                                     stdout=subprocess.PIPE,
                                     stderr=subprocess.PIPE)
 
-    def has_finished(self):
-        """Check if the command has completed"""
-        if self.returncode is not None:
-            return True
+        # Read the output as the command runs, so it can't block writing to a full pipe.
+        self._stdout_file = tempfile.SpooledTemporaryFile(max_size=FI_OUTPUT_BUFFER_SIZE)
+        self._stderr_file = tempfile.SpooledTemporaryFile(max_size=FI_OUTPUT_BUFFER_SIZE)
+        for (pipe, out_file) in ((self._sp.stdout, self._stdout_file),
+                                 (self._sp.stderr, self._stderr_file)):
+            reader = threading.Thread(target=self._drain, args=(pipe, out_file), daemon=True)
+            reader.start()
+            self._readers.append(reader)
 
-        rc = self._sp.poll()
-        if rc is None:
-            return False
-        self._post(rc)
-        return True
+    @staticmethod
+    def _drain(pipe, out_file):
+        """Copy data from a pipe to a file until the pipe is closed"""
+        for data in iter(lambda: pipe.read1(64 * 1024), b''):
+            out_file.write(data)
+        pipe.close()
+
+    def _read_output(self):
+        """Return the stdout and stderr of the command, after it has exited"""
+        for reader in self._readers:
+            reader.join()
+        output = []
+        for out_file in (self._stdout_file, self._stderr_file):
+            out_file.seek(0)
+            output.append(out_file.read())
+            out_file.close()
+        return output
+
+    def notify_exit(self, done):
+        """Add self to the done queue when the command exits, without checking it"""
+
+        def _wait_thread():
+            self._sp.wait()
+            done.put(self)
+
+        threading.Thread(target=_wait_thread, daemon=True).start()
 
     def wait(self):
         """Wait for the command to complete"""
@@ -3711,8 +3897,7 @@ class AllocFailTestRun():
         # Put in a new-line.
         print()
         self.returncode = rc
-        self.stdout = self._sp.stdout.read()
-        self.stderr = self._sp.stderr.read()
+        (self.stdout, self.stderr) = self._read_output()
 
         show_memleaks = True
 
@@ -3866,6 +4051,8 @@ class AllocFailTest():
         print('Maximum number of spawned tests will be {}'.format(max_child))
 
         active = []
+        # Commands which have exited, with the future of their log check.
+        checks = []
         fid = 2
         max_count = 0
         finished = False
@@ -3875,34 +4062,49 @@ class AllocFailTest():
 
         fatal_errors = False
 
+        # Commands add themselves to this queue when they exit.
+        done = queue.Queue()
+
         # Now run all iterations in parallel up to max_child.  Iterations will be launched
         # in order but may not finish in order, rather they are processed in the order they
-        # finish.  After each repetition completes then check for re-launch new processes
-        # to keep the pipeline full.
-        while not finished or active:
-
-            if not finished:
-                while len(active) < max_child:
-                    active.append(self._run_cmd(fid))
-                    fid += 1
+        # finish.  As each command exits a new one is launched to keep the pipeline full, and
+        # the log of the finished one is checked in the background.  Log checks report to
+        # shared state so are run one at a time, in the order that commands exit, and the
+        # number of pending checks is limited as it's not known when to stop launching new
+        # commands until the checks report that no fault was injected.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                   thread_name_prefix='nlt_fi_check') as pool:
+            while not finished or active or checks:
+
+                if not finished:
+                    while len(active) < max_child and len(checks) < max_child:
+                        ret = self._run_cmd(fid)
+                        ret.notify_exit(done)
+                        active.append(ret)
+                        fid += 1
+
+                        if len(active) > max_count:
+                            max_count = len(active)
+
+                if active:
+                    ret = done.get()
+                    active.remove(ret)
+                    checks.append((ret, pool.submit(ret.wait)))
+                else:
+                    concurrent.futures.wait([checks[0][1]])
 
-                    if len(active) > max_count:
-                        max_count = len(active)
+                # Now complete as many as have been checked.
+                while checks and checks[0][1].done():
+                    (ret, future) = checks.pop(0)
+                    future.result()
+                    print(ret)
+                    if ret.returncode < 0:
+                        fatal_errors = True
+                        to_rerun.append(ret.loc)
 
-            # Now complete as many as have finished.
-            for ret in active:
-                if not ret.has_finished():
-                    continue
-                active.remove(ret)
-                print(ret)
-                if ret.returncode < 0:
-                    fatal_errors = True
-                    to_rerun.append(ret.loc)
-
-                if not ret.fault_injected:
-                    print('Fault injection did not trigger, stopping')
-                    finished = True
-                break
+                    if not ret.fault_injected and not finished:
+                        print('Fault injection did not trigger, stopping')
+                        finished = True
 
         print('Completed, fid {}'.format(fid))
         print('Max in flight {}'.format(max_count))
@@ -4317,6 +4519,8 @@ def main():
     parser.add_argument('--max-log-size', default=None)
     parser.add_argument('--engine-count', type=int, default=1, help='Number of daos engines to run')
     parser.add_argument('--dfuse-dir', default='/tmp', help='parent directory for all dfuse mounts')
+    parser.add_argument('--compress-jobs', type=int, default=None,
+                        help='Number of log files to compress at once, default is the cpu count')
     parser.add_argument('--perf-check', action='store_true')
     parser.add_argument('--dtx', action='store_true')
     parser.add_argument('--test', help="Use '--test list' for list")